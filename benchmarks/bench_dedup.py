@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: spatial-hash dedupe_nearby vs the old pairwise 0.001° loop.
+
+    python benchmarks/bench_dedup.py [--sizes 500,2000,5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chargebot.utils.geo import dedupe_nearby  # noqa: E402
+
+
+def make_stations(n: int, seed: int = 42) -> list[dict]:
+    """Stations around Minsk; about a third are near-duplicates of another one."""
+    rnd = random.Random(seed)
+    stations = []
+    for i in range(n):
+        if stations and rnd.random() < 0.33:
+            base = rnd.choice(stations)
+            lat = base["latitude"] + rnd.uniform(-0.0005, 0.0005)
+            lon = base["longitude"] + rnd.uniform(-0.0005, 0.0005)
+        else:
+            lat = 53.9 + rnd.uniform(-0.5, 0.5)
+            lon = 27.56 + rnd.uniform(-0.8, 0.8)
+        stations.append({"ext_id": str(i), "latitude": lat, "longitude": lon})
+    return stations
+
+
+def dedupe_pairwise(stations: list[dict]) -> list[dict]:
+    unique_stations = []
+    for station in stations:
+        is_duplicate = False
+        for existing in unique_stations:
+            if (abs(station["latitude"] - existing["latitude"]) < 0.001 and
+                abs(station["longitude"] - existing["longitude"]) < 0.001):
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            unique_stations.append(station)
+    return unique_stations
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,1000,5000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'n':>7} {'pairwise ms':>12} {'spatial ms':>11} {'kept (pw/sp)':>14}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        stations = make_stations(n)
+        key = lambda st: (st["latitude"], st["longitude"])  # noqa: E731
+        t_pw = best_of(lambda: dedupe_pairwise(stations), args.repeat)
+        t_sp = best_of(lambda: dedupe_nearby(stations, key, 100.0), args.repeat)
+        kept_pw = len(dedupe_pairwise(stations))
+        kept_sp = len(dedupe_nearby(stations, key, 100.0))
+        print(f"{n:>7} {t_pw * 1000:>12.2f} {t_sp * 1000:>11.2f} {kept_pw:>6}/{kept_sp:<7}")
+
+
+if __name__ == "__main__":
+    main()
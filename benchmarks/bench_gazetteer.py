@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark: gazetteer lookups (exact, prefix, typo) against the bundled data.
+
+Reports index build time and mean microseconds per lookup for each query
+kind, plus a brute-force edit-distance scan over all keys for comparison
+with the deletion index.
+
+    python benchmarks/bench_gazetteer.py [--number 2000]
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chargebot.gazetteer import Gazetteer, edit_distance, normalize  # noqa: E402
+
+QUERIES = {
+    "exact": ["Минск", "Maladziečna", "барановичи", "Гомель", "Нясвіж"],
+    "prefix": ["бобр", "mol", "Свет", "Мар'", "gro"],
+    "typo": ["Маладечно", "Барановчи", "Вицебск", "mogilyov", "Салигорск"],
+    "miss": ["xyzxyzxyz", "Москва", "qwerty"],
+}
+
+
+def brute_force(gazetteer: Gazetteer, query: str) -> list[int]:
+    key = normalize(query)
+    return [pos for pos, k in enumerate(gazetteer._keys) if edit_distance(key, k, 2) <= 2]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    gazetteer = Gazetteer.from_file()
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"{len(gazetteer)} settlements, {len(gazetteer._keys)} keys, index built in {build_ms:.1f} ms")
+
+    print(f"{'kind':>7} {'lookup us':>10} {'brute us':>9}")
+    for kind, queries in QUERIES.items():
+        lookup = min(timeit.repeat(lambda: [gazetteer.lookup(q) for q in queries], number=args.number, repeat=3))
+        brute = min(timeit.repeat(lambda: [brute_force(gazetteer, q) for q in queries], number=max(1, args.number // 50), repeat=3))
+        lookup_us = lookup / args.number / len(queries) * 1e6
+        brute_us = brute / max(1, args.number // 50) / len(queries) * 1e6
+        print(f"{kind:>7} {lookup_us:>10.1f} {brute_us:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: k-nearest-within-radius over N points.
+
+Compares the scalar haversine loop + full sort with PointColumns.nearest
+(NumPy when installed, and the pure-Python fallback).
+
+    python benchmarks/bench_geo.py [--sizes 10000,100000] [--radius 50] [--k 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chargebot.utils import geo  # noqa: E402
+from chargebot.utils.geo import PointColumns, haversine_km  # noqa: E402
+
+
+def make_points(n: int, seed: int = 7) -> list[tuple[float, float]]:
+    """Points spread over the Belarus bounding box."""
+    rnd = random.Random(seed)
+    return [(rnd.uniform(51.3, 56.2), rnd.uniform(23.2, 32.8)) for _ in range(n)]
+
+
+def scalar_nearest(points, lat, lon, radius_km, k):
+    found = []
+    for i, (p_lat, p_lon) in enumerate(points):
+        d = haversine_km(lat, lon, p_lat, p_lon)
+        if d <= radius_km:
+            found.append((d, i))
+    found.sort()
+    return found[:k]
+
+
+def time_queries(fn, origins, repeat: int) -> float:
+    """Best-of-repeat mean seconds per query."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for lat, lon in origins:
+            fn(lat, lon)
+        best = min(best, (time.perf_counter() - t0) / len(origins))
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--radius", type=float, default=50.0)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    origins = [(rnd.uniform(52.0, 55.5), rnd.uniform(24.0, 31.0)) for _ in range(args.queries)]
+
+    print(f"numpy: {'yes' if geo.np is not None else 'no (fallback only)'}")
+    print(f"{'n':>8} {'scalar ms':>10} {'python ms':>10} {'numpy ms':>9}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        points = make_points(n)
+        py_cols = PointColumns(points, use_numpy=False)
+        t_scalar = time_queries(lambda la, lo: scalar_nearest(points, la, lo, args.radius, args.k), origins, args.repeat)
+        t_python = time_queries(lambda la, lo: py_cols.nearest(la, lo, args.radius, args.k), origins, args.repeat)
+        if geo.np is not None:
+            np_cols = PointColumns(points, use_numpy=True)
+            t_numpy = time_queries(lambda la, lo: np_cols.nearest(la, lo, args.radius, args.k), origins, args.repeat)
+            numpy_col = f"{t_numpy * 1000:>9.3f}"
+        else:
+            numpy_col = f"{'-':>9}"
+        print(f"{n:>8} {t_scalar * 1000:>10.3f} {t_python * 1000:>10.3f} {numpy_col}")
+
+
+if __name__ == "__main__":
+    main()
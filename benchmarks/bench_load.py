@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Load generator: synthetic users against the real Application, offline.
+
+The application comes from create_application (concurrent updates, rate
+limiter, handlers, SQLite store, caches) with two things stubbed: the Bot
+API transport, which answers every call after --telegram-ms, and the
+providers, registered under stub_* names, which answer after
+--provider-ms with payloads shaped like OpenChargeMap, PlugShare and the
+Belarus networks. Updates are put on the update queue the way polling
+does. Users arrive as a Poisson process and go through one scenario each:
+
+    location  share a location
+    minsk     press "📍 Минск"
+    city      press "🏙️ Поиск по городу", then type a city (some with typos)
+    add       press "➕ Добавить станцию", share a location, type a name and an operator
+
+Each --rates step offers that many updates per second for --duration
+seconds and reports throughput, handler latency (update queued to last
+handler done), event-loop lag, Bot API calls and errors; a per-update-kind
+breakdown follows for the last step. By default Telegram's flood limits
+from the settings apply, which is usually what saturates first;
+--unthrottled lifts them to find the limits of the process itself.
+
+    python benchmarks/bench_load.py [--rates 10,25,50] [--duration 10] [--mix location=60,minsk=20,city=15,add=5]
+    python benchmarks/bench_load.py --unthrottled --rates 100,200,400
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import replace
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:load")
+
+from telegram import Update  # noqa: E402
+from telegram.ext import Application, TypeHandler  # noqa: E402
+from telegram.request import BaseRequest, RequestData  # noqa: E402
+
+from bench_pipeline import BBOX, make_payloads  # noqa: E402
+from chargebot import metrics  # noqa: E402
+from chargebot.bot import create_application, run_precompute  # noqa: E402
+from chargebot.config import load_settings  # noqa: E402
+from chargebot.logs import setup_logging  # noqa: E402
+from chargebot.providers import belarus_networks, openchargemap, plugshare  # noqa: E402
+from chargebot.providers.registry import GEO_CACHE, NETWORK, Provider, register_provider  # noqa: E402
+
+CITIES = ["Минск", "Гомель", "Брест", "Маладзечна", "Pinsk", "барановичи", "Бабруйск", "Вицебск", "Салигорск", "Лида"]
+SCENARIOS = {
+    "location": lambda rnd: [("location", _random_point(rnd))],
+    "minsk": lambda rnd: [("minsk", "📍 Минск")],
+    "city": lambda rnd: [("menu", "🏙️ Поиск по городу"), ("city", rnd.choice(CITIES))],
+    "add": lambda rnd: [
+        ("menu", "➕ Добавить станцию"),
+        ("add_location", _random_point(rnd)),
+        ("add_name", f"ЭЗС {rnd.randint(1, 999)}"),
+        ("add_operator", rnd.choice(["Malanka", "A-100", "Частная"])),
+    ],
+}
+# Pause between a user's own updates
+THINK_S = 0.2
+# Provider payloads are generated once per 0.1° cell
+PAYLOAD_CELL_DECIMALS = 1
+
+
+def _random_point(rnd: random.Random) -> tuple[float, float]:
+    return rnd.uniform(BBOX[0], BBOX[1]), rnd.uniform(BBOX[2], BBOX[3])
+
+
+class StubRequest(BaseRequest):
+    """Bot API transport answering every call with a plausible result after a fixed delay."""
+
+    def __init__(self, latency_s: float) -> None:
+        self.latency_s = latency_s
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=None,
+        write_timeout=None,
+        connect_timeout=None,
+        pool_timeout=None,
+    ) -> tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[endpoint] += 1
+        params = request_data.parameters if request_data is not None else {}
+        await asyncio.sleep(self.latency_s)
+        if endpoint == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Load", "username": "load_bot"}
+        elif endpoint in ("sendMessage", "editMessageText"):
+            result = {
+                "message_id": params.get("message_id") or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": params.get("chat_id"), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def register_stub_providers(latency_s: float, size: int, seed: int) -> list[str]:
+    """Register stub_* providers that sleep latency_s and return size records each."""
+    rnd = random.Random(seed)
+    payloads: dict[tuple[float, float], dict[str, list[dict]]] = {}
+
+    def fake_fetch(source: str):
+        async def fetch_nearby(*, lat: float, lon: float, **kwargs) -> list[dict]:
+            await asyncio.sleep(latency_s)
+            cell = (round(lat, PAYLOAD_CELL_DECIMALS), round(lon, PAYLOAD_CELL_DECIMALS))
+            if cell not in payloads:
+                payloads[cell] = make_payloads(*cell, size, rnd)
+            return payloads[cell][source]
+        return fetch_nearby
+
+    specs = [
+        (openchargemap, 10, frozenset({NETWORK, GEO_CACHE})),
+        (plugshare, 20, frozenset({NETWORK, GEO_CACHE})),
+        (belarus_networks, 30, frozenset({NETWORK})),
+    ]
+    names = []
+    for module, priority, capabilities in specs:
+        name = f"stub_{module.SOURCE}"
+        register_provider(name, lambda s, module=module, name=name, priority=priority, capabilities=capabilities: Provider(
+            name=name,
+            fetch=fake_fetch(module.SOURCE),
+            normalize=module.normalize_record,
+            timeout_s=5.0,
+            priority=priority,
+            capabilities=capabilities,
+            coords=getattr(module, "record_coords", None),
+        ))
+        names.append(name)
+    return names
+
+
+class Tracker:
+    """Knows when each injected update has been handled, via a handler in the last group."""
+
+    def __init__(self) -> None:
+        self._waiting: dict[int, asyncio.Future] = {}
+        self.errors = 0
+
+    def expect(self, update_id: int) -> asyncio.Future:
+        future = self._waiting[update_id] = asyncio.get_running_loop().create_future()
+        return future
+
+    async def on_done(self, update: Update, context) -> None:
+        future = self._waiting.pop(update.update_id, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    async def on_error(self, update: object, context) -> None:
+        self.errors += 1
+
+
+class LagSampler:
+    """Event-loop lag samples, as the overshoot of short sleeps."""
+
+    def __init__(self, interval_s: float = 0.02) -> None:
+        self.interval_s = interval_s
+        self.samples: list[float] = []
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval_s)
+            self.samples.append(max(0.0, loop.time() - t0 - self.interval_s))
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))]
+
+
+def make_update(app: Application, update_id: int, user_id: int, payload) -> Update:
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "Load"},
+    }
+    if isinstance(payload, tuple):
+        message["location"] = {"latitude": payload[0], "longitude": payload[1]}
+    else:
+        message["text"] = payload
+    return Update.de_json({"update_id": update_id, "message": message}, app.bot)
+
+
+async def run_step(
+    app: Application, tracker: Tracker, rate: float, duration_s: float, mix: dict[str, float], rnd: random.Random
+) -> tuple[dict, dict[str, list[float]]]:
+    """Offer `rate` updates/s for duration_s; returns the summary and latencies per update kind."""
+    update_ids = itertools.count(int(time.time() * 1000))
+    latencies: dict[str, list[float]] = defaultdict(list)
+    kinds, weights = zip(*mix.items())
+    mean_len = sum(w * len(SCENARIOS[k](rnd)) for k, w in mix.items()) / sum(weights)
+    sessions: list[asyncio.Task] = []
+
+    async def session(steps: list) -> None:
+        user_id = rnd.randint(1, 10**9)
+        for i, (kind, payload) in enumerate(steps):
+            if i:
+                await asyncio.sleep(THINK_S)
+            update_id = next(update_ids)
+            done = tracker.expect(update_id)
+            t0 = time.perf_counter()
+            await app.update_queue.put(make_update(app, update_id, user_id, payload))
+            await done
+            latencies[kind].append(time.perf_counter() - t0)
+
+    lag = LagSampler()
+    lag_task = asyncio.create_task(lag.run())
+    errors_before = tracker.errors
+    started = time.perf_counter()
+    offered = 0
+    # Arrivals are scheduled on absolute times, so a busy loop doesn't lower the offered rate
+    next_arrival = 0.0
+    while next_arrival < duration_s:
+        wait = next_arrival - (time.perf_counter() - started)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        steps = SCENARIOS[rnd.choices(kinds, weights)[0]](rnd)
+        offered += len(steps)
+        sessions.append(asyncio.create_task(session(steps)))
+        next_arrival += rnd.expovariate(rate / mean_len)
+    await asyncio.gather(*sessions)
+    elapsed = time.perf_counter() - started
+    lag_task.cancel()
+
+    everything = sorted(t for values in latencies.values() for t in values)
+    lags = sorted(lag.samples)
+    summary = {
+        "offered": offered / duration_s,
+        "throughput": len(everything) / elapsed,
+        "p50_ms": percentile(everything, 0.50) * 1000,
+        "p95_ms": percentile(everything, 0.95) * 1000,
+        "p99_ms": percentile(everything, 0.99) * 1000,
+        "lag_p99_ms": percentile(lags, 0.99) * 1000,
+        "lag_max_ms": (lags[-1] if lags else 0.0) * 1000,
+        "errors": tracker.errors - errors_before,
+    }
+    return summary, latencies
+
+
+def search_paths() -> dict[str, int]:
+    """chargebot_search_requests_total by path, read from the metrics exposition."""
+    paths = {}
+    for line in metrics.render().splitlines():
+        if line.startswith("chargebot_search_requests_total{"):
+            labels, value = line.rsplit(" ", 1)
+            paths[labels.split('"')[1]] = int(float(value))
+    return paths
+
+
+async def run(args: argparse.Namespace) -> None:
+    setup_logging(args.log_level, "text")
+    mix = {k: float(v) for k, v in (part.split("=") for part in args.mix.split(","))}
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios {sorted(unknown)}, available: {', '.join(SCENARIOS)}")
+    rnd = random.Random(args.seed)
+
+    tmp = tempfile.mkdtemp(prefix="chargebot-load-")
+    settings = replace(
+        load_settings(),
+        db_url=f"sqlite:///{os.path.join(tmp, 'load.db')}",
+        enabled_providers=tuple(register_stub_providers(args.provider_ms / 1000, args.size, args.seed)),
+    )
+    if args.unthrottled:
+        settings = replace(settings, tg_global_rate=1e9, tg_chat_rate=1e9, tg_group_rate_per_min=1e9)
+
+    transport = StubRequest(args.telegram_ms / 1000)
+    app = await create_application(settings, request=transport)
+    tracker = Tracker()
+    app.add_handler(TypeHandler(Update, tracker.on_done), group=99)
+    app.add_error_handler(tracker.on_error)
+    await app.initialize()
+    await app.start()
+
+    precompute_task = None
+    if settings.precompute_interval_s > 0:
+        precompute_task = asyncio.create_task(run_precompute(app))
+        # Like a bot that has been up for a while: the first pass is done
+        while not app.bot_data["precomputed_replies"] and not precompute_task.done():
+            await asyncio.sleep(0.05)
+
+    print(f"{'offered/s':>9} {'done/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'lag p99':>8} {'lag max':>8} {'errors':>6}")
+    latencies: dict[str, list[float]] = {}
+    try:
+        for rate in (float(r) for r in args.rates.split(",")):
+            summary, latencies = await run_step(app, tracker, rate, args.duration, mix, rnd)
+            print(
+                f"{summary['offered']:>9.1f} {summary['throughput']:>7.1f} {summary['p50_ms']:>8.1f} {summary['p95_ms']:>8.1f} "
+                f"{summary['p99_ms']:>8.1f} {summary['lag_p99_ms']:>8.1f} {summary['lag_max_ms']:>8.1f} {summary['errors']:>6}"
+            )
+        user_stations = len(await app.bot_data["db_readers"].list_user_stations())
+    finally:
+        if precompute_task is not None:
+            precompute_task.cancel()
+        await app.stop()
+        await app.shutdown()
+        await app.bot_data["http_session"].close()
+        await asyncio.to_thread(app.bot_data["db_writer"].close)
+        app.bot_data["db_readers"].close()
+
+    print(f"\nLast step by update kind:\n{'kind':>12} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind, values in sorted(latencies.items()):
+        values.sort()
+        print(
+            f"{kind:>12} {len(values):>6} {percentile(values, 0.5) * 1000:>8.1f} {percentile(values, 0.95) * 1000:>8.1f} "
+            f"{percentile(values, 0.99) * 1000:>8.1f} {values[-1] * 1000:>8.1f}"
+        )
+    print(f"\nSearch paths: {search_paths()}")
+    print(f"User stations stored: {user_stations}")
+    print(f"Bot API calls: {dict(transport.calls.most_common())}")
+    print(f"Rate limiter: {app.bot.rate_limiter.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", default="10,25,50", help="offered updates per second, one step each")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per step")
+    parser.add_argument("--mix", default="location=60,minsk=20,city=15,add=5")
+    parser.add_argument("--telegram-ms", type=float, default=40.0, help="simulated Bot API round trip")
+    parser.add_argument("--provider-ms", type=float, default=150.0, help="simulated provider latency")
+    parser.add_argument("--size", type=int, default=50, help="records per provider response")
+    parser.add_argument("--unthrottled", action="store_true", help="lift Telegram flood limits")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--log-level", default="WARNING")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
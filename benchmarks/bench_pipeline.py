@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the location search pipeline end to end, offline.
+
+on_location is driven with real telegram Update/Message objects bound to a
+fake bot that records replies instead of calling Telegram. Fake providers
+return payloads shaped like OpenChargeMap, PlugShare and Belarus network
+responses (--size records each, a share of them near-duplicates across
+sources). Reads go to an empty SQLite store, so every search takes the
+live path: fan-out and normalization, dedup, ranking, the background
+upsert and rendering. The stages are also measured on their own:
+
+    normalize   search_all over the fake providers (items: payload records)
+    dedup       dedupe_nearby on the merged stations (items: stations in)
+    rank        nearest_k for the user's position (items: stations in)
+    db_upsert   one StationWriter batch, awaited (items: rows)
+    format      _render_results of the reply (items: replies)
+    end_to_end  on_location including both Telegram calls (items: requests)
+
+For each stage: p50/p95/p99 latency, items per second and the peak memory
+allocated per operation (tracemalloc, measured in a separate pass).
+--check compares against the stored baseline and exits with status 1 if
+p50, p95 or allocations got worse by more than --tolerance; --save-baseline
+rewrites it. Baselines are only comparable on the same machine.
+
+    python benchmarks/bench_pipeline.py [--size 100] [--requests 300]
+    python benchmarks/bench_pipeline.py --check
+    python benchmarks/bench_pipeline.py --save-baseline
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import replace
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+
+from telegram import Chat, Location, Message, Update, User  # noqa: E402
+
+from chargebot import db  # noqa: E402
+from chargebot.bot import DUPLICATE_DISTANCE_M, _render_results, _station_coords, on_location  # noqa: E402
+from chargebot.config import load_settings  # noqa: E402
+from chargebot.providers import belarus_networks, openchargemap, plugshare  # noqa: E402
+from chargebot.providers.registry import Provider, search_all  # noqa: E402
+from chargebot.utils.geo import dedupe_nearby, nearest_k  # noqa: E402
+from chargebot.utils.singleflight import SingleFlight  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline_pipeline.json")
+
+# Search points spread over Belarus
+BBOX = (51.5, 55.8, 24.0, 30.8)
+# Share of PlugShare/Belarus records that duplicate an OpenChargeMap station
+DUPLICATE_SHARE = 0.3
+OPERATORS = ["Malanka", "A-100", "Белоруснефть", "Zaryadka", None]
+STATUSES = ["Operational", "Unknown", "Planned", "Temporarily Unavailable"]
+CHECKED = ("p50_ms", "p95_ms", "alloc_kib")
+
+
+def _near(rnd: random.Random, lat: float, lon: float, spread: float) -> tuple[float, float]:
+    return lat + rnd.uniform(-spread, spread), lon + rnd.uniform(-spread, spread)
+
+
+def make_payloads(lat: float, lon: float, size: int, rnd: random.Random) -> dict[str, list[dict]]:
+    """Provider responses for one search around (lat, lon)."""
+    ocm = []
+    for i in range(size):
+        s_lat, s_lon = _near(rnd, lat, lon, 0.3)
+        ocm.append({
+            "ID": rnd.randint(1, 10**6),
+            "UUID": f"{rnd.getrandbits(128):032x}",
+            "AddressInfo": {
+                "Title": f"Станция {i}",
+                "AddressLine1": f"ул. Примерная, {rnd.randint(1, 200)}",
+                "Town": "Минск",
+                "Latitude": s_lat,
+                "Longitude": s_lon,
+            },
+            "OperatorInfo": {"Title": rnd.choice(OPERATORS)},
+            "StatusType": {"Title": rnd.choice(STATUSES)},
+            "Connections": [{"PowerKW": rnd.choice([22, 50, 75, 150]), "Quantity": 1} for _ in range(rnd.randint(1, 4))],
+            "DateLastStatusUpdate": "2024-05-01T10:00:00Z",
+        })
+
+    def position() -> tuple[float, float]:
+        if rnd.random() < DUPLICATE_SHARE:
+            base = rnd.choice(ocm)["AddressInfo"]
+            return _near(rnd, base["Latitude"], base["Longitude"], 0.0003)
+        return _near(rnd, lat, lon, 0.3)
+
+    ps = []
+    for i in range(size):
+        s_lat, s_lon = position()
+        ps.append({
+            "id": rnd.randint(1, 10**6),
+            "name": f"PlugShare {i}",
+            "address": {"street": f"пр. Независимости, {rnd.randint(1, 200)}", "city": "Минск"},
+            "operator": {"name": rnd.choice(OPERATORS)},
+            "latitude": s_lat,
+            "longitude": s_lon,
+            "stations": [{"outlets": [{"power": rnd.choice([7, 22, 50])} for _ in range(rnd.randint(1, 3))]}],
+            "available": rnd.random() < 0.7,
+            "updated_at": "2024-05-01T10:00:00Z",
+        })
+
+    by = []
+    for i in range(size):
+        s_lat, s_lon = position()
+        network = rnd.choice(["malanka", "a100", "belorusneft"])
+        by.append({
+            "id": f"{network}_{rnd.randint(1, 10**6)}",
+            "name": f"{network} {i}",
+            "address": f"ул. Тестовая, {rnd.randint(1, 200)}",
+            "operator": network,
+            "latitude": s_lat,
+            "longitude": s_lon,
+            "power_kw": rnd.choice([22, 50, 120]),
+            "network": network,
+        })
+    return {openchargemap.SOURCE: ocm, plugshare.SOURCE: ps, belarus_networks.SOURCE: by}
+
+
+def make_providers(payloads: dict[tuple[float, float], dict[str, list[dict]]]) -> list[Provider]:
+    """Providers answering from the prepared payloads; no network, cache or breaker involved."""
+    def fake_fetch(source: str):
+        async def fetch_nearby(*, lat: float, lon: float, **kwargs) -> list[dict]:
+            return payloads[(lat, lon)][source]
+        return fetch_nearby
+
+    return [
+        Provider(name=openchargemap.SOURCE, fetch=fake_fetch(openchargemap.SOURCE), normalize=openchargemap.normalize_record, timeout_s=5.0, priority=10),
+        Provider(name=plugshare.SOURCE, fetch=fake_fetch(plugshare.SOURCE), normalize=plugshare.normalize_record, timeout_s=5.0, priority=20),
+        Provider(name=belarus_networks.SOURCE, fetch=fake_fetch(belarus_networks.SOURCE), normalize=belarus_networks.normalize_record, timeout_s=5.0, priority=30),
+    ]
+
+
+class FakeBot:
+    """Stands in for telegram.Bot behind Message.reply_text/edit_text and keeps what was sent."""
+
+    def __init__(self) -> None:
+        self.replies: list[tuple[str, str]] = []
+        self._ids = itertools.count(1000)
+        self._chat = Chat(id=1, type=Chat.PRIVATE)
+
+    def _message(self, text: str, message_id: int | None = None) -> Message:
+        message = Message(
+            message_id=message_id or next(self._ids),
+            date=datetime.now(timezone.utc),
+            chat=self._chat,
+            text=text,
+        )
+        message.set_bot(self)
+        return message
+
+    async def send_message(self, chat_id, text: str, **kwargs) -> Message:
+        self.replies.append(("send", text))
+        return self._message(text)
+
+    async def edit_message_text(self, text: str, chat_id=None, message_id=None, **kwargs) -> Message:
+        self.replies.append(("edit", text))
+        return self._message(text, message_id)
+
+
+class BenchApplication:
+    """The part of telegram.ext.Application the search handlers use."""
+
+    def __init__(self, bot_data: dict) -> None:
+        self.bot_data = bot_data
+
+    def create_task(self, coro, update=None) -> asyncio.Task:
+        return asyncio.get_running_loop().create_task(coro)
+
+
+def make_update(bot: FakeBot, update_id: int, lat: float, lon: float) -> Update:
+    message = Message(
+        message_id=update_id,
+        date=datetime.now(timezone.utc),
+        chat=Chat(id=1, type=Chat.PRIVATE),
+        from_user=User(id=1, first_name="Bench", is_bot=False),
+        location=Location(longitude=lon, latitude=lat),
+    )
+    message.set_bot(bot)
+    return Update(update_id=update_id, message=message)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))]
+
+
+async def measure(ops: list, run, items) -> dict:
+    """Time run(op) for every op, then repeat under tracemalloc for the peak allocation per op."""
+    times = []
+    total_items = 0
+    for op in ops:
+        t0 = time.perf_counter()
+        await run(op)
+        times.append(time.perf_counter() - t0)
+        total_items += items(op)
+
+    gc.collect()
+    tracemalloc.start()
+    peaks = []
+    for op in ops[: max(1, len(ops) // 5)]:
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await run(op)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(max(0, peak - base))
+    tracemalloc.stop()
+
+    times.sort()
+    peaks.sort()
+    return {
+        "p50_ms": percentile(times, 0.50) * 1000,
+        "p95_ms": percentile(times, 0.95) * 1000,
+        "p99_ms": percentile(times, 0.99) * 1000,
+        "per_second": total_items / sum(times),
+        "alloc_kib": percentile(peaks, 0.50) / 1024,
+    }
+
+
+async def run_suite(size: int, requests: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    points = [(rnd.uniform(BBOX[0], BBOX[1]), rnd.uniform(BBOX[2], BBOX[3])) for _ in range(min(requests, 100))]
+    payloads = {p: make_payloads(*p, size, rnd) for p in points}
+    providers = make_providers(payloads)
+
+    tmp = tempfile.mkdtemp(prefix="chargebot-bench-")
+    store_url = f"sqlite:///{os.path.join(tmp, 'store.db')}"
+    empty_url = f"sqlite:///{os.path.join(tmp, 'empty.db')}"
+    db.init_db(store_url)
+    db.init_db(empty_url)
+    settings = replace(load_settings(), db_url=store_url)
+    writer = db.StationWriter(store_url)
+    writer.start()
+    readers = db.ReadPool(empty_url, 2)
+    bot = FakeBot()
+    app = BenchApplication({
+        "settings": settings,
+        "providers": providers,
+        "db_writer": writer,
+        "db_readers": readers,
+        "search_flights": SingleFlight(),
+        "provider_cache": None,
+    })
+    context = SimpleNamespace(application=app, bot_data=app.bot_data, user_data={})
+    ops = [points[i % len(points)] for i in range(requests)]
+
+    async def normalized(point):
+        return await search_all(providers, lat=point[0], lon=point[1], radius_km=settings.default_search_radius_km, max_results=size)
+
+    merged = {p: await normalized(p) for p in points}
+    unique = {p: dedupe_nearby(merged[p], _station_coords, DUPLICATE_DISTANCE_M) for p in points}
+    ranked = {}
+    for p in points:
+        ranked[p] = []
+        for d, st in nearest_k(unique[p], _station_coords, *p):
+            st.distance_km = d
+            ranked[p].append(st)
+    rows = {p: [st.as_row() for st in unique[p]] for p in points}
+
+    async def dedup(point):
+        dedupe_nearby(merged[point], _station_coords, DUPLICATE_DISTANCE_M)
+
+    async def rank(point):
+        nearest_k(unique[point], _station_coords, *point)
+
+    async def upsert(point):
+        await writer.upsert_stations(rows[point])
+
+    async def render(point):
+        _render_results(ranked[point], *point)
+
+    update_ids = itertools.count(1)
+
+    async def end_to_end(point):
+        await on_location(make_update(bot, next(update_ids), *point), context)
+
+    results = {}
+    try:
+        # Warm up imports, SQLite pages and the writer thread
+        for point in points[:5]:
+            await end_to_end(point)
+        results["normalize"] = await measure(ops, normalized, lambda p: sum(len(v) for v in payloads[p].values()))
+        results["dedup"] = await measure(ops, dedup, lambda p: len(merged[p]))
+        results["rank"] = await measure(ops, rank, lambda p: len(unique[p]))
+        results["db_upsert"] = await measure(ops, upsert, lambda p: len(rows[p]))
+        results["format"] = await measure(ops, render, lambda p: 1)
+        bot.replies.clear()
+        results["end_to_end"] = await measure(ops, end_to_end, lambda p: 1)
+    finally:
+        await asyncio.to_thread(writer.close)
+        readers.close()
+
+    edits = [text for kind, text in bot.replies if kind == "edit"]
+    if not edits or any("⚡" not in text for text in edits):
+        raise SystemExit(f"end_to_end: unexpected replies, e.g. {edits[:1] or bot.replies[:1]}")
+    print(f"{len(bot.replies)} replies captured, {sum(len(u) for u in unique.values()) / len(unique):.0f} stations per search after dedup")
+    return results
+
+
+def check(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for stage, base in baseline["stages"].items():
+        current = results.get(stage)
+        if current is None:
+            regressions.append(f"{stage}: missing from this run")
+            continue
+        for key in CHECKED:
+            # Differences under 0.1 ms or 1 KiB are scheduling noise
+            limit = base[key] * (1 + tolerance) + (0.1 if key.endswith("_ms") else 1.0)
+            if current[key] > limit:
+                regressions.append(f"{stage} {key}: {current[key]:.3f} > {base[key]:.3f} (+{tolerance:.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100, help="records per provider response")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--check", action="store_true", help="fail on regressions against the baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_suite(args.size, args.requests, args.seed))
+
+    print(f"{'stage':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'items/s':>10} {'alloc KiB':>10}")
+    for stage, r in results.items():
+        print(f"{stage:>11} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['per_second']:>10.0f} {r['alloc_kib']:>10.1f}")
+
+    params = {"size": args.size, "requests": args.requests, "seed": args.seed}
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            stages = {stage: {k: round(v, 4) for k, v in r.items()} for stage, r in results.items()}
+            json.dump({"params": params, "stages": stages}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+    if args.check:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["params"] != params:
+            raise SystemExit(f"Baseline was recorded with {baseline['params']}, run with the same parameters")
+        regressions = check(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Memory/allocation benchmark: slotted Station vs the former per-record dicts.
+
+Normalizes N OpenChargeMap-shaped payloads both ways and reports retained
+memory (tracemalloc) and normalization time. The dict variant keeps the raw
+payload like the old normalizers did; payloads are dropped before measuring
+so only what the normalized set keeps alive is counted.
+
+    python benchmarks/bench_station_memory.py [--sizes 1000,10000]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chargebot.providers.openchargemap import normalize_record  # noqa: E402
+
+OPERATORS = ["Malanka", "A-100", "Белоруснефть", "Zaryadka", None]
+STATUSES = ["Operational", "Unknown", "Planned", "Temporarily Unavailable"]
+
+
+def make_payloads(n: int, seed: int = 3) -> list[dict]:
+    rnd = random.Random(seed)
+    payloads = []
+    for i in range(n):
+        payloads.append({
+            "ID": 100000 + i,
+            "UUID": f"{rnd.getrandbits(128):032x}",
+            "AddressInfo": {
+                "Title": f"Station {i}",
+                "AddressLine1": f"ул. Примерная, {rnd.randint(1, 200)}",
+                "Town": "Минск",
+                "Latitude": rnd.uniform(51.3, 56.2),
+                "Longitude": rnd.uniform(23.2, 32.8),
+            },
+            # Operator/status strings arrive as fresh objects per record, like parsed JSON
+            "OperatorInfo": {"Title": "".join(rnd.choice(OPERATORS) or "")},
+            "StatusType": {"Title": "".join(rnd.choice(STATUSES))},
+            "Connections": [{"PowerKW": rnd.choice([22, 50, 75, 150]), "Quantity": 1} for _ in range(rnd.randint(1, 4))],
+            "DateLastStatusUpdate": "2024-05-01T10:00:00Z",
+        })
+    return payloads
+
+
+def normalize_dict(item: dict) -> dict:
+    """The pre-Station normalizer output, kept here for comparison."""
+    addr_info = item.get("AddressInfo", {})
+    connections = item.get("Connections", []) or []
+    return {
+        "ext_id": str(item.get("ID")),
+        "name": addr_info.get("Title"),
+        "address": addr_info.get("AddressLine1"),
+        "operator": item.get("OperatorInfo", {}).get("Title"),
+        "latitude": float(addr_info.get("Latitude")),
+        "longitude": float(addr_info.get("Longitude")),
+        "power_kw": max((c.get("PowerKW") or 0) for c in connections) if connections else None,
+        "status": item.get("StatusType", {}).get("Title"),
+        "last_seen_utc": item.get("DateLastStatusUpdate"),
+        "source": "openchargemap",
+        "raw": item,
+    }
+
+
+def measure(n: int, normalize) -> tuple[float, float]:
+    """(retained KiB, seconds) for normalizing n fresh payloads."""
+    payloads = make_payloads(n)
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    normalized = [normalize(p) for p in payloads]
+    elapsed = time.perf_counter() - t0
+    del payloads
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del normalized
+    return retained / 1024, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000")
+    args = parser.parse_args()
+
+    print(f"{'n':>7} {'dict KiB':>10} {'Station KiB':>12} {'ratio':>6} {'dict ms':>8} {'Station ms':>11}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        dict_kib, dict_s = measure(n, normalize_dict)
+        st_kib, st_s = measure(n, normalize_record)
+        print(f"{n:>7} {dict_kib:>10.0f} {st_kib:>12.0f} {dict_kib / st_kib:>6.1f} {dict_s * 1000:>8.1f} {st_s * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
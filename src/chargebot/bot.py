@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any
+import html
+import logging
+import math
+import time
+from operator import attrgetter
 
 from telegram import (
+    Message,
     Update,
     KeyboardButton,
     ReplyKeyboardMarkup,
@@ -12,37 +17,111 @@ from telegram import (
     InlineKeyboardButton,
 )
 from telegram.constants import ParseMode
-from telegram.ext import Application, CommandHandler, MessageHandler, ContextTypes, filters
-
-from .config import load_settings
-from .db import init_db, upsert_stations
-from .providers.openchargemap import fetch_nearby as ocm_fetch_nearby, normalize_record as ocm_normalize_record
-from .providers.plugshare import fetch_nearby as ps_fetch_nearby, normalize_record as ps_normalize_record
-from .providers.belarus_networks import fetch_nearby as by_fetch_nearby, normalize_record as by_normalize_record, add_user_station
-from .utils.geo import haversine_km
-
-
-def _format_station_human(st: dict[str, Any], user_lat: float, user_lon: float) -> tuple[str, InlineKeyboardMarkup]:
-    d_km = haversine_km(user_lat, user_lon, st["latitude"], st["longitude"]) if user_lat and user_lon else None
-    title = st.get("name") or "Зарядная станция"
-    addr = st.get("address") or "—"
-    oper = st.get("operator") or "—"
-    power = f"≈ {st['power_kw']} кВт" if st.get("power_kw") else "—"
-    status = st.get("status") or "—"
+from telegram.ext import Application, CallbackContext, CommandHandler, MessageHandler, ContextTypes, TypeHandler, filters
+from telegram.request import BaseRequest
+
+from .cache import GeoCellCache
+from .config import Settings, load_settings
+from .db import ReadPool, StationWriter, init_db
+from .gazetteer import get_gazetteer
+from .http_session import create_http_session
+from .logs import request_id, setup_logging
+from .ingest import run_ocm_sync
+from . import metrics
+from .metrics import SEARCH_LATENCY, SEARCH_REQUESTS
+from .models import Station
+from .providers.belarus_networks import (
+    SOURCE as BY_SOURCE,
+    normalize_record as by_normalize_record,
+    add_user_station,
+    load_user_stations,
+    new_user_station,
+    remove_user_stations,
+    user_station_ids,
+)
+from .providers.registry import BULK_SYNC, Provider, build_providers, search_each
+from .rate_limit import TelegramRateLimiter
+from .server import create_web_app, start_server
+from .webhook import add_webhook_route, register_webhook
+from .utils.circuit_breaker import OPEN
+from .utils.geo import dedupe_nearby, haversine_km, nearest_k
+from .utils.singleflight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
+
+# Stations from different providers closer than this are treated as one
+DUPLICATE_DISTANCE_M = 100.0
+
+# The local store is asked for this many times max_results, so deduplication doesn't shrink the reply
+LOCAL_OVERFETCH = 3
+
+# Searches whose coordinates agree to this many decimals (~100 m) share one provider fan-out
+COALESCE_DECIMALS = 3
+
+_station_coords = attrgetter("latitude", "longitude")
+
+MINSK_CENTER = (53.9045, 27.5615)
+
+# Cities whose replies are kept precomputed (regional centres)
+PRECOMPUTED_CITIES = ("Минск", "Гомель", "Могилёв", "Витебск", "Гродно", "Брест")
+
+
+# Stations shown in the reply
+TOP_RESULTS = 5
+
+NOT_FOUND_TEXT = (
+    "🔍 <b>Станции не найдены</b>\n\n"
+    "Возможные причины:\n"
+    "• В этом районе пока нет зарегистрированных станций\n"
+    "• Радиус поиска слишком мал (текущий: 50 км)\n"
+    "• Координаты указаны неверно\n\n"
+    "💡 <b>Что делать:</b>\n"
+    "• Попробуйте поиск из другого места\n"
+    "• Добавьте недостающую станцию через меню\n"
+    "• Проверьте данные на сайтах операторов"
+)
+
+
+def _format_station_human(index: int, st: Station, user_lat: float, user_lon: float) -> str:
+    d_km = st.distance_km
+    if d_km is None and user_lat and user_lon:
+        d_km = haversine_km(user_lat, user_lon, st.latitude, st.longitude)
+    title = html.escape(st.name or "Зарядная станция")
+    addr = html.escape(st.address or "—")
+    oper = html.escape(st.operator or "—")
+    power = f"≈ {st.power_kw} кВт" if st.power_kw else "—"
+    status = html.escape(st.status or "—")
     dist = f" (~{d_km:.1f} км)" if d_km is not None else ""
 
-    text = (
-        f"⚡ <b>{title}</b>{dist}\n"
+    return (
+        f"{index}. ⚡ <b>{title}</b>{dist}\n"
         f"🏠 Адрес: {addr}\n"
         f"🏢 Оператор: {oper}\n"
         f"🔌 Мощность: {power}\n"
         f"📊 Статус: {status}"
     )
-    map_url = f"https://maps.google.com/?q={st['latitude']},{st['longitude']}"
-    kb = InlineKeyboardMarkup(
-        [[InlineKeyboardButton(text="🗺️ Открыть на карте", url=map_url)]]
-    )
-    return text, kb
+
+
+def _render_results(stations: list[Station], user_lat: float, user_lon: float, note: str | None = None) -> tuple[str, InlineKeyboardMarkup]:
+    """One message for the top stations, with a map button per station."""
+    top = stations[:TOP_RESULTS]
+    header = f"🔌 <b>Ближайшие станции: {len(top)}</b>"
+    if len(stations) > len(top):
+        header += f" из {len(stations)}"
+    parts = [header]
+    if note:
+        parts.append(note)
+    parts.extend(_format_station_human(i, st, user_lat, user_lon) for i, st in enumerate(top, start=1))
+
+    buttons = []
+    for i, st in enumerate(top, start=1):
+        label = st.name or "Зарядная станция"
+        if len(label) > 28:
+            label = label[:27] + "…"
+        map_url = f"https://maps.google.com/?q={st.latitude},{st.longitude}"
+        buttons.append([InlineKeyboardButton(text=f"🗺️ {i}. {label}", url=map_url)])
+    return "\n\n".join(parts), InlineKeyboardMarkup(buttons)
 
 
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -86,32 +165,13 @@ async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def cmd_test_minsk(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Test command with Minsk coordinates"""
-    # Mock location for Minsk center
-    from telegram import Location
-    mock_location = Location(latitude=53.9045, longitude=27.5615)
-
-    # Create mock update with location
-    class MockMessage:
-        def __init__(self, location):
-            self.location = location
-
-        async def reply_text(self, text, **kwargs):
-            await update.effective_message.reply_text(text, **kwargs)
-
-        async def reply_html(self, text, **kwargs):
-            await update.effective_message.reply_html(text, **kwargs)
-
-    class MockUpdate:
-        def __init__(self, message):
-            self.effective_message = message
-
-    mock_update = MockUpdate(MockMessage(mock_location))
-
-    await on_location(mock_update, context)
+    await search_and_reply(update.effective_message, context, *MINSK_CENTER)
 
 
 async def cmd_add_station(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Start adding a new station"""
+    # The next location this user shares is the station's, not a search
+    context.user_data['adding_station'] = True
     await update.effective_message.reply_text(
         "➕ <b>Добавление станции</b>\n\n"
         "Чтобы добавить новую зарядную станцию:\n\n"
@@ -129,6 +189,7 @@ async def on_location_for_add(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     # Store location for later use
+    context.user_data.pop('adding_station', None)
     context.user_data['pending_station_lat'] = update.effective_message.location.latitude
     context.user_data['pending_station_lon'] = update.effective_message.location.longitude
 
@@ -159,8 +220,19 @@ async def on_text_for_add(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         lon = context.user_data['pending_station_lon']
         name = context.user_data['pending_station_name']
 
-        # Add the station
-        success = add_user_station(name, "", operator, lat, lon)
+        # Persist the station, then make it searchable
+        station = new_user_station(name, "", operator, lat, lon)
+        writer: StationWriter = context.application.bot_data["db_writer"]
+        try:
+            await writer.insert_user_station(station, submitted_by=update.effective_user.id if update.effective_user else None)
+            add_user_station(station)
+            # Also into the station store, so local-first searches see it right away
+            writer.upsert_stations([by_normalize_record(station).as_row()]).add_done_callback(_log_write_error)
+            _invalidate_precomputed(context, lat, lon)
+            success = True
+        except Exception:
+            logger.exception("Adding user station failed")
+            success = False
 
         if success:
             await update.effective_message.reply_text(
@@ -186,32 +258,15 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     if text == "📍 Минск":
         # Quick search for Minsk
-        from telegram import Location
-        mock_location = Location(latitude=53.9045, longitude=27.5615)
-
-        # Create a proper mock message with location
-        class MockMessage:
-            def __init__(self, original_message, location):
-                self.location = location
-                # Copy other attributes from original message
-                for attr in dir(original_message):
-                    if not attr.startswith('_') and attr != 'location':
-                        try:
-                            setattr(self, attr, getattr(original_message, attr))
-                        except:
-                            pass
-
-        mock_message = MockMessage(update.message, mock_location)
-        mock_update = Update(update_id=update.update_id, message=mock_message)
-        await on_location(mock_update, context)
+        await search_and_reply(update.effective_message, context, *MINSK_CENTER)
 
     elif text == "🏙️ Поиск по городу":
         # Ask user to enter city name
         context.user_data['waiting_for_city'] = True
         await update.effective_message.reply_text(
             "🏙️ <b>Поиск по городу</b>\n\n"
-            "Введите название города на русском или английском языке.\n"
-            "Например: Минск, Гомель, Брест, Витебск, Могилев, Гродно",
+            "Введите название города или посёлка на русском, белорусском или латиницей.\n"
+            "Например: Минск, Гомель, Маладзечна, Pinsk",
             parse_mode="HTML",
             reply_markup=ReplyKeyboardMarkup([["❌ Отмена"]], resize_keyboard=True, one_time_keyboard=True)
         )
@@ -248,291 +303,518 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 
 async def search_by_city_name(update: Update, context: ContextTypes.DEFAULT_TYPE, city_name: str) -> None:
-    """Search for charging stations by city name using geocoding"""
-    # Simple geocoding for Belarusian cities
-    city_coords = {
-        # Major Belarusian cities
-        'минск': (53.9045, 27.5615),
-        'гомель': (52.4417, 30.9754),
-        'брест': (52.0976, 23.7341),
-        'витебск': (55.1904, 30.2049),
-        'могилев': (53.9168, 30.3449),
-        'гродно': (53.6694, 23.8133),
-        'москва': (55.7558, 37.6176),  # For testing
-        'киев': (50.4501, 30.5234),   # For testing
-
-        # English variants
-        'minsk': (53.9045, 27.5615),
-        'gomel': (52.4417, 30.9754),
-        'brest': (52.0976, 23.7341),
-        'vitebsk': (55.1904, 30.2049),
-        'mogilev': (53.9168, 30.3449),
-        'grodno': (53.6694, 23.8133),
-        'moscow': (55.7558, 37.6176),
-        'kiev': (50.4501, 30.5234),
-    }
-
-    city_lower = city_name.lower().strip()
-
-    if city_lower in city_coords:
-        lat, lon = city_coords[city_lower]
-
-        # Create mock location and search
-        from telegram import Location
-        mock_location = Location(latitude=lat, longitude=lon)
-
-        class MockMessage:
-            def __init__(self, original_message, location):
-                self.location = location
-                for attr in dir(original_message):
-                    if not attr.startswith('_') and attr != 'location':
-                        try:
-                            setattr(self, attr, getattr(original_message, attr))
-                        except:
-                            pass
-
-        mock_message = MockMessage(update.message, mock_location)
-        mock_update = Update(update_id=update.update_id, message=mock_message)
+    """Search for charging stations by city name using the offline gazetteer"""
+    settlement = get_gazetteer().lookup(city_name)
 
+    if settlement is not None:
         # Clear waiting state
         context.user_data.pop('waiting_for_city', None)
 
-        await update.effective_message.reply_text(f"🔍 Ищу станции в городе: {city_name}")
-        await on_location(mock_update, context)
+        await search_and_reply(
+            update.effective_message,
+            context,
+            settlement.lat,
+            settlement.lon,
+            searching_text=f"🔍 Ищу станции в городе: {settlement.name_ru}",
+        )
 
     else:
         await update.effective_message.reply_text(
             f"❌ Город '{city_name}' не найден.\n\n"
-            "Попробуйте ввести один из основных городов:\n"
-            "🇧🇾 Минск, Гомель, Брест, Витебск, Могилев, Гродно\n"
-            "🌍 Москва, Киев (для тестирования)\n\n"
+            "Проверьте название: подойдёт написание по-русски, по-белорусски или латиницей, "
+            "например «Молодечно», «Маладзечна» или «Maladziečna».\n\n"
             "Или нажмите '❌ Отмена' для возврата в меню.",
             reply_markup=ReplyKeyboardMarkup([["❌ Отмена"]], resize_keyboard=True, one_time_keyboard=True)
         )
 
 
-async def on_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    if not update.effective_message or not update.effective_message.location:
-        return
-    user_loc = update.effective_message.location
-    lat = user_loc.latitude
-    lon = user_loc.longitude
+def _live_providers(context: ContextTypes.DEFAULT_TYPE) -> list[Provider]:
+    """Providers a live search queries: sources mirrored locally by a background sync aren't queried per request."""
+    providers: list[Provider] = context.application.bot_data["providers"]
+    synced = context.application.bot_data.get("synced_sources", set())
+    return [p for p in providers if not (BULK_SYNC in p.capabilities and p.name in synced)]
 
+
+async def _fetch_live(context: ContextTypes.DEFAULT_TYPE, lat: float, lon: float) -> list[Station]:
+    """Query all enabled providers, then deduplicate, store and rank the results."""
     settings = context.application.bot_data["settings"]
+    active = _live_providers(context)
+
+    # Identical searches running at the same time (e.g. many "📍 Минск" presses) share one fan-out
+    flights: SingleFlight = context.application.bot_data["search_flights"]
+    key = (
+        round(lat, COALESCE_DECIMALS),
+        round(lon, COALESCE_DECIMALS),
+        settings.default_search_radius_km,
+        settings.max_results,
+        tuple(p.name for p in active),
+    )
+    stations = await flights.do(key, lambda: _fetch_providers(context, active, lat, lon))
 
-    await update.effective_message.reply_text("🔍 Ищу ближайшие станции…")
+    # Rank for this caller's own position on copies: coalesced callers share the stations
+    return [st.with_distance(d) for d, st in nearest_k(stations, _station_coords, lat, lon)]
 
+
+async def _fetch_providers(
+    context: ContextTypes.DEFAULT_TYPE, providers: list[Provider], lat: float, lon: float
+) -> list[Station]:
+    settings = context.application.bot_data["settings"]
+    cache: GeoCellCache = context.application.bot_data["provider_cache"]
+    writer: StationWriter = context.application.bot_data["db_writer"]
+
+    logger.debug(
+        "Fetching stations from providers",
+        extra={"lat": lat, "lon": lon, "radius_km": settings.default_search_radius_km},
+    )
+    results = await search_each(
+        providers,
+        lat=lat,
+        lon=lon,
+        radius_km=settings.default_search_radius_km,
+        max_results=settings.max_results,
+        session=context.application.bot_data.get("http_session"),
+        cache=cache,
+    )
+
+    normalized = []
+    for provider, stations in results:
+        if stations is None:
+            continue
+        normalized.extend(stations)
+        # Store each answer with the area it covers, in the background (the reply doesn't wait for it)
+        covered_km = _covered_km(stations, lat, lon, settings)
+        writer.store_area(provider.name, lat, lon, covered_km, (st.as_row() for st in stations)).add_done_callback(
+            _log_write_error
+        )
+    logger.debug("Providers returned %d stations", len(normalized), extra={"stations": len(normalized)})
+
+    # Remove duplicates by location (within 100m)
+    return dedupe_nearby(normalized, _station_coords, DUPLICATE_DISTANCE_M)
+
+
+def _covered_km(stations: list[Station], lat: float, lon: float, settings) -> float:
+    """Radius around (lat, lon) within which a provider's answer lists all its stations."""
+    if len(stations) < settings.max_results:
+        return settings.default_search_radius_km
+    # Cut off at max_results: complete only up to the farthest station returned
+    return max(haversine_km(lat, lon, st.latitude, st.longitude) for st in stations)
+
+
+def _log_write_error(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Station store write failed: %s", future.exception())
+
+
+def _dedupe_ranked(context: ContextTypes.DEFAULT_TYPE, stations: list[Station], limit: int | None = None) -> list[Station]:
+    """
+    Deduplicate stations given nearest first, keeping that order: of two
+    records closer than DUPLICATE_DISTANCE_M the higher-priority provider's
+    wins, as on the live path.
+    """
+    priorities = {p.name: p.priority for p in context.application.bot_data["providers"]}
+    # Stable sort: each source stays in distance order
+    by_priority = sorted(stations, key=lambda st: priorities.get(st.source, math.inf))
+    kept = {id(st) for st in dedupe_nearby(by_priority, _station_coords, DUPLICATE_DISTANCE_M)}
+    return [st for st in stations if id(st) in kept][:limit]
+
+
+async def _local_answer(
+    context: ContextTypes.DEFAULT_TYPE, lat: float, lon: float
+) -> tuple[list[Station], dict[str, float] | None]:
+    """
+    Nearest stored stations, deduplicated, and whether they are the whole
+    answer. The store only holds what earlier searches and the bulk sync
+    returned, so the list counts as complete only if every source a live
+    search would ask has answered a search covering the circle the list
+    spans. Then the second item maps those sources to their latest refresh
+    time; None means a live search is needed. Bulk-synced sources cover
+    everywhere, and sources behind an open breaker can't be asked.
+    """
+    settings = context.application.bot_data["settings"]
+    readers: ReadPool = context.application.bot_data["db_readers"]
+    radius_km = settings.default_search_radius_km
+    limit = settings.max_results * LOCAL_OVERFETCH
     try:
-        # Fetch from multiple providers
-        all_items = []
-        print(f"🔍 Fetching stations from providers (lat={lat:.4f}, lon={lon:.4f}, radius={settings.default_search_radius_km}km)...")
+        rows = await readers.query_nearby(lat, lon, radius_km, limit)
+        stations = _dedupe_ranked(context, rows, settings.max_results)
+        # Distance up to which `stations` holds every stored station
+        if len(stations) == settings.max_results:
+            complete_km = stations[-1].distance_km
+        elif len(rows) < limit:
+            complete_km = radius_km
+        else:
+            complete_km = rows[-1].distance_km
+        covered = await readers.coverage_at(lat, lon, complete_km, radius_km)
+    except Exception as e:
+        logger.warning("Local store query failed: %s", e)
+        return [], None
 
-        # OpenChargeMap
-        try:
-            print("🌐 Fetching from OpenChargeMap...")
-            ocm_items = await ocm_fetch_nearby(
-                lat=lat,
-                lon=lon,
-                radius_km=settings.default_search_radius_km,
-                max_results=settings.max_results,
-                api_key=settings.openchargemap_api_key,
-            )
-            all_items.extend(ocm_items)
-            print(f"✅ OpenChargeMap: {len(ocm_items)} stations")
-        except Exception as e:
-            print(f"❌ OpenChargeMap error: {e}")
+    required = _refreshable_sources(context)
+    if not required <= covered.keys():
+        return stations, None
+    return stations, {source: covered[source] for source in required}
 
-        # PlugShare
-        try:
-            print("🔌 Fetching from PlugShare...")
-            ps_items = await ps_fetch_nearby(
-                lat=lat,
-                lon=lon,
-                radius_km=settings.default_search_radius_km,
-                max_results=settings.max_results,
-                api_key=settings.plugshare_api_key,
-            )
-            all_items.extend(ps_items)
-            print(f"✅ PlugShare: {len(ps_items)} stations")
-        except Exception as e:
-            print(f"❌ PlugShare error: {e}")
 
-        # Belarusian networks (no API key needed)
-        try:
-            print("🇧🇾 Fetching from Belarusian networks...")
-            by_items = await by_fetch_nearby(
-                lat=lat,
-                lon=lon,
-                radius_km=settings.default_search_radius_km,
-                max_results=settings.max_results,
-                api_key=None,
-            )
-            all_items.extend(by_items)
-            print(f"✅ Belarus networks: {len(by_items)} stations")
-        except Exception as e:
-            print(f"❌ Belarus networks error: {e}")
+async def _live_answer(
+    context: ContextTypes.DEFAULT_TYPE, lat: float, lon: float, local: list[Station]
+) -> list[Station]:
+    """Live fan-out results merged with the stored stations of bulk-synced sources, which it doesn't query."""
+    synced = context.application.bot_data.get("synced_sources", set())
+    stations = await _fetch_live(context, lat, lon)
+    stations += [st for st in local if st.source in synced]
+    stations.sort(key=attrgetter("distance_km"))
+    return _dedupe_ranked(context, stations)
 
-        print(f"📊 Total raw stations fetched: {len(all_items)}")
 
-        if not all_items:
-            await update.effective_message.reply_text("Рядом ничего не найдено. Попробуйте увеличить радиус поиска или проверьте координаты.")
-            return
+def _format_age(seconds: float) -> str:
+    if seconds < 3600:
+        return f"{max(1, int(seconds // 60))} мин"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} ч"
+    return f"{int(seconds // 86400)} дн"
 
-    except Exception as e:
-        await update.effective_message.reply_text(f"Ошибка запроса: {e}")
+
+def _schedule_refresh(context: ContextTypes.DEFAULT_TYPE, lat: float, lon: float) -> None:
+    """Start one background provider refresh per cache cell; repeat calls are no-ops while it runs."""
+    settings = context.application.bot_data["settings"]
+    refreshing: set = context.application.bot_data.setdefault("refreshing_cells", set())
+    cell = (math.floor(lat / settings.cache_cell_deg), math.floor(lon / settings.cache_cell_deg))
+    if cell in refreshing:
         return
+    refreshing.add(cell)
 
-    # Normalize all items
-    normalized = []
-    for item in all_items:
+    async def refresh() -> None:
         try:
-            if "AddressInfo" in item:  # OpenChargeMap format
-                normalized.append(ocm_normalize_record(item))
-            elif "stations" in item or "address" in item and isinstance(item.get("address"), dict):  # PlugShare format
-                normalized.append(ps_normalize_record(item))
-            else:  # Belarus networks format
-                normalized.append(by_normalize_record(item))
+            stations = await _fetch_live(context, lat, lon)
+            logger.info("Background refresh of cell %s: %d stations", cell, len(stations))
         except Exception as e:
-            print(f"Normalization error: {e}")
-            continue
+            logger.warning("Background refresh of cell %s failed: %s", cell, e)
+        finally:
+            refreshing.discard(cell)
 
-    # Remove duplicates by location (within 100m)
-    unique_stations = []
-    for station in normalized:
-        is_duplicate = False
-        for existing in unique_stations:
-            if (abs(station["latitude"] - existing["latitude"]) < 0.001 and
-                abs(station["longitude"] - existing["longitude"]) < 0.001):
-                is_duplicate = True
-                break
-        if not is_duplicate:
-            unique_stations.append(station)
-
-    if not unique_stations:
-        await update.effective_message.reply_text("Рядом ничего не найдено. Попробуйте увеличить радиус поиска или проверьте координаты.")
-        return
+    context.application.create_task(refresh())
 
-    normalized = unique_stations
 
-    # Cache into SQLite (best-effort, ignore errors)
-    try:
-        upsert_stations(
-            settings.db_url,
-            (
-                (
-                    n["ext_id"],
-                    n.get("name"),
-                    n.get("address"),
-                    n.get("operator"),
-                    n["latitude"],
-                    n["longitude"],
-                    n.get("power_kw"),
-                    n.get("status"),
-                    n.get("last_seen_utc"),
-                )
-                for n in normalized
-            ),
-        )
-    except Exception:
-        pass
+def _refreshable_sources(context: ContextTypes.DEFAULT_TYPE) -> set[str]:
+    """Sources a background refresh can update right now: queried live and not cut off by an open breaker."""
+    return {p.name for p in _live_providers(context) if p.breaker is None or p.breaker.state != OPEN}
 
-    if not normalized:
-        await update.effective_message.reply_text(
-            "🔍 <b>Станции не найдены</b>\n\n"
-            "Возможные причины:\n"
-            "• В этом районе пока нет зарегистрированных станций\n"
-            "• Радиус поиска слишком мал (текущий: 50 км)\n"
-            "• Координаты указаны неверно\n\n"
-            "💡 <b>Что делать:</b>\n"
-            "• Попробуйте поиск из другого места\n"
-            "• Добавьте недостающую станцию через меню\n"
-            "• Проверьте данные на сайтах операторов",
-            parse_mode="HTML"
-        )
+
+def _coverage_age_s(coverage: dict[str, float], now: float) -> float:
+    """Age of the least recently refreshed source behind a local answer (0 if none is required)."""
+    return now - min(coverage.values(), default=now)
+
+
+def _known_locations() -> list[tuple[float, float]]:
+    """Fixed search points: the Minsk button and the precomputed cities as the gazetteer resolves them."""
+    gazetteer = get_gazetteer()
+    points = [MINSK_CENTER]
+    for name in PRECOMPUTED_CITIES:
+        points.extend(s.coords for s in gazetteer.exact(name)[:1])
+    return list(dict.fromkeys(points))
+
+
+async def _compute_reply(
+    context: ContextTypes.DEFAULT_TYPE, lat: float, lon: float
+) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Rendered reply for a point, from the local store if fresh, otherwise from the providers."""
+    settings = context.application.bot_data["settings"]
+    stations, coverage = await _local_answer(context, lat, lon)
+    if coverage is None or _coverage_age_s(coverage, time.time()) > settings.local_max_age_s:
+        stations = await _live_answer(context, lat, lon, stations)
+    if not stations:
+        return NOT_FOUND_TEXT, None
+    return _render_results(stations, lat, lon)
+
+
+async def run_precompute(app: Application) -> None:
+    """Background job: keep ready-to-send replies for the fixed city points in memory."""
+    settings = app.bot_data["settings"]
+    context = CallbackContext(app)
+    replies: dict = app.bot_data["precomputed_replies"]
+    request_id.set("precompute")
+    while True:
+        t0 = time.perf_counter()
+        await _drop_rejected_user_stations(app)
+        for point in _known_locations():
+            try:
+                text, kb = await _compute_reply(context, *point)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Precomputing reply for %s failed: %s", point, e)
+                continue
+            replies[point] = (time.monotonic(), text, kb)
+        logger.info("Precomputed %d city replies in %.1fs", len(replies), time.perf_counter() - t0)
+        await asyncio.sleep(settings.precompute_interval_s)
+
+
+async def _drop_rejected_user_stations(app: Application) -> None:
+    """
+    Stop serving user stations rejected by moderation since they were
+    loaded. Their stored copy is removed by a database trigger; this takes
+    them out of the belarus_networks index.
+    """
+    indexed = user_station_ids()
+    try:
+        kept = {station["id"] for station in await app.bot_data["db_readers"].list_user_stations()}
+    except Exception as e:
+        logger.warning("Reloading user stations failed: %s", e)
         return
+    # Only stations indexed before the read: ones added meanwhile may not be in it yet
+    removed = remove_user_stations(indexed - kept)
+    if removed:
+        # Cached belarus_networks responses still hold them and would store them again
+        app.bot_data["provider_cache"].invalidate(BY_SOURCE)
+        logger.info("Removed %d rejected user stations", removed)
 
-    # Send top 5 with formatting
-    top = normalized[:5]
-    for st in top:
-        text, kb = _format_station_human(st, lat, lon)
-        await update.effective_message.reply_html(text, reply_markup=kb, disable_web_page_preview=True)
 
+def _precomputed_reply(
+    context: ContextTypes.DEFAULT_TYPE, lat: float, lon: float
+) -> tuple[str, InlineKeyboardMarkup | None] | None:
+    settings = context.application.bot_data["settings"]
+    entry = context.application.bot_data.get("precomputed_replies", {}).get((lat, lon))
+    # Tolerate one failed refresh before falling back to a regular search
+    if entry is None or time.monotonic() - entry[0] > 2 * settings.precompute_interval_s:
+        return None
+    return entry[1], entry[2]
 
-async def create_application() -> Application:
-    print("Loading settings...")
-    settings = load_settings()
-    print("Settings loaded successfully")
 
-    # Initialize DB (sqlite only) if path points to sqlite
-    if settings.db_url.startswith("sqlite///") or settings.db_url.startswith("sqlite:///"):
-        print("Initializing database...")
+def _invalidate_precomputed(context: ContextTypes.DEFAULT_TYPE, lat: float, lon: float) -> None:
+    """Drop precomputed replies whose search radius covers (lat, lon)."""
+    settings = context.application.bot_data["settings"]
+    replies: dict = context.application.bot_data.get("precomputed_replies", {})
+    for point in [p for p in replies if haversine_km(p[0], p[1], lat, lon) <= settings.default_search_radius_km]:
+        del replies[point]
+
+
+async def search_and_reply(
+    message: Message,
+    context: ContextTypes.DEFAULT_TYPE,
+    lat: float,
+    lon: float,
+    searching_text: str = "🔍 Ищу ближайшие станции…",
+) -> None:
+    """
+    Find stations near (lat, lon) and answer with a single message: a
+    placeholder is sent first and then edited in place with the results.
+    Fixed city points are answered directly from the precomputed replies.
+    """
+    t0 = time.perf_counter()
+    path = await _search_and_reply(message, context, lat, lon, searching_text)
+    SEARCH_REQUESTS.labels(path).inc()
+    SEARCH_LATENCY.labels(path).observe(time.perf_counter() - t0)
+
+
+async def _search_and_reply(
+    message: Message, context: ContextTypes.DEFAULT_TYPE, lat: float, lon: float, searching_text: str
+) -> str:
+    """search_and_reply without the metrics; returns the answer path."""
+    settings = context.application.bot_data["settings"]
+
+    precomputed = _precomputed_reply(context, lat, lon)
+    if precomputed is not None:
+        text, kb = precomputed
+        await message.reply_text(text, parse_mode=ParseMode.HTML, reply_markup=kb, disable_web_page_preview=True)
+        return "precomputed"
+
+    placeholder = await message.reply_text(searching_text)
+
+    # Local-first: answer from the station store, providers are only queried to refresh it
+    note = None
+    normalized, coverage = await _local_answer(context, lat, lon)
+    now = time.time()
+    if coverage is not None and _coverage_age_s(coverage, now) <= settings.local_max_age_s:
+        path = "local"
+        logger.debug("Answering from local store", extra={"stations": len(normalized)})
+    elif coverage is not None:
+        # Stale-while-revalidate: reply with what we have, refresh in the background
+        path = "stale"
+        age_s = _coverage_age_s(coverage, now)
+        logger.debug("Answering from stale local store, refreshing", extra={"stations": len(normalized), "age_s": round(age_s)})
+        _schedule_refresh(context, lat, lon)
+        note = f"🕒 Данные обновлены {_format_age(age_s)} назад, обновляю в фоне…"
+    else:
+        path = "live"
         try:
-            init_db(settings.db_url)
-            print("Database initialized successfully")
+            normalized = await _live_answer(context, lat, lon, normalized)
         except Exception as e:
-            print(f"Database initialization failed (non-critical): {e}")
+            logger.exception("Live search failed")
+            await placeholder.edit_text(f"Ошибка запроса: {e}")
+            return "error"
+
+    if not normalized:
+        await placeholder.edit_text(NOT_FOUND_TEXT, parse_mode=ParseMode.HTML)
+        return "not_found"
+
+    text, kb = _render_results(normalized, lat, lon, note)
+    await placeholder.edit_text(text, parse_mode=ParseMode.HTML, reply_markup=kb, disable_web_page_preview=True)
+    return path
+
 
-    print("Creating Telegram application...")
-    app = (
+async def on_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not update.effective_message or not update.effective_message.location:
+        return
+    if context.user_data.get('adding_station'):
+        await on_location_for_add(update, context)
+        return
+    user_loc = update.effective_message.location
+    await search_and_reply(update.effective_message, context, user_loc.latitude, user_loc.longitude)
+
+
+async def create_application(settings: Settings | None = None, request: BaseRequest | None = None) -> Application:
+    """
+    Build the application with its shared resources in bot_data. request
+    replaces the HTTP transport to the Bot API (used by the load harness).
+    """
+    if settings is None:
+        settings = load_settings()
+
+    # Initialize DB (load_settings only accepts sqlite:/// URLs)
+    try:
+        init_db(settings.db_url)
+        logger.info("Database initialized")
+    except Exception as e:
+        logger.warning("Database initialization failed (non-critical): %s", e)
+
+    builder = (
         Application.builder()
         .token(settings.telegram_token)
         .concurrent_updates(True)
-        .build()
+        .rate_limiter(TelegramRateLimiter(
+            global_rate=settings.tg_global_rate,
+            chat_rate=settings.tg_chat_rate,
+            group_rate=settings.tg_group_rate_per_min / 60,
+            max_retries=settings.tg_max_retries,
+        ))
     )
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    app = builder.build()
     app.bot_data["settings"] = settings
-    print("Telegram application created")
+    # Store objects first: nothing to clean up yet if they fail
+    app.bot_data["db_writer"] = StationWriter(settings.db_url)
+    app.bot_data["db_readers"] = ReadPool(settings.db_url, size=settings.db_read_pool_size)
+    app.bot_data["db_writer"].start()
+    app.bot_data["http_session"] = create_http_session(settings)
+    app.bot_data["providers"] = build_providers(settings)
+    logger.info("Providers: %s", ", ".join(p.name for p in app.bot_data["providers"]))
+    try:
+        loaded = load_user_stations(await app.bot_data["db_readers"].list_user_stations())
+        logger.info("Loaded %d user stations", loaded)
+    except Exception as e:
+        logger.warning("Loading user stations failed (non-critical): %s", e)
+    app.bot_data["search_flights"] = SingleFlight()
+    app.bot_data["precomputed_replies"] = {}
+    # Load the gazetteer up front so the first city search doesn't pay for building the index
+    logger.info("Gazetteer: %d settlements", len(get_gazetteer()))
+    app.bot_data["provider_cache"] = GeoCellCache(
+        ttl_s=settings.cache_ttl_s,
+        cell_deg=settings.cache_cell_deg,
+        max_entries=settings.cache_max_entries,
+        max_bytes=settings.cache_max_bytes,
+    )
+    _register_metric_sources(app)
 
-    print("Adding handlers...")
+    # Runs first for every update and tags its log lines with the update id
+    app.add_handler(TypeHandler(Update, _bind_request_id), group=-1)
     app.add_handler(CommandHandler("start", cmd_start))
     app.add_handler(CommandHandler("help", cmd_help))
     app.add_handler(CommandHandler("test_minsk", cmd_test_minsk))
     app.add_handler(CommandHandler("add_station", cmd_add_station))
     app.add_handler(MessageHandler(filters.LOCATION, on_location))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_text))
-    print("Handlers added")
+    logger.info("Telegram application created")
 
     return app
 
 
+async def _bind_request_id(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    # Each update is processed in its own task, so this stays with the update and the tasks it starts
+    request_id.set(f"u{update.update_id}")
+
+
+def _register_metric_sources(app: Application) -> None:
+    """Point the scrape-time metrics at this application's cache, writer and rate limiter."""
+    cache: GeoCellCache = app.bot_data["provider_cache"]
+    writer: StationWriter = app.bot_data["db_writer"]
+    metrics.CACHE_HITS.set_function(lambda: cache.hits)
+    metrics.CACHE_MISSES.set_function(lambda: cache.misses)
+    metrics.CACHE_HIT_RATIO.set_function(lambda: cache.stats()["hit_ratio"])
+    metrics.CACHE_BYTES.set_function(lambda: cache.stats()["bytes"])
+    metrics.DB_WRITE_QUEUE.set_function(lambda: writer.pending)
+    rate_limiter = app.bot.rate_limiter
+    if isinstance(rate_limiter, TelegramRateLimiter):
+        metrics.TELEGRAM_QUEUE_DEPTH.set_function(lambda: rate_limiter.queue_depth)
+
+
 async def run_bot() -> None:
-    print("Starting bot application...")
-    app = await create_application()
-    print("Initializing application...")
-    await app.initialize()
-    print("Starting application...")
-    await app.start()
-    print("Bot started successfully!")
-
-    # Test connection before full startup
-    print("Testing Telegram connection...")
+    """
+    Run the bot until cancelled. The HTTP server (health checks, metrics and
+    the webhook route) comes up first, so probes get answers during startup.
+    """
+    settings = load_settings()
+    setup_logging(settings.log_level, settings.log_format)
+    logger.info("Starting bot application")
+    app = await create_application(settings)
+    web_app = create_web_app(app, settings)
+    if settings.bot_mode == "webhook":
+        add_webhook_route(web_app, app, settings)
+    runner = await start_server(web_app, settings)
+
+    sync_task = None
+    precompute_task = None
+    lag_task = asyncio.create_task(metrics.monitor_loop_lag())
     try:
-        # Test bot connection with timeout
-        await asyncio.wait_for(app.bot.get_me(), timeout=10.0)
-        print("Telegram connection test passed")
-    except asyncio.TimeoutError:
-        print("Telegram connection test timed out")
-        raise Exception("Failed to connect to Telegram API")
-    except Exception as e:
-        print(f"Telegram connection test failed: {e}")
-        raise
+        await app.initialize()
+        await app.start()
+        logger.info("Bot started")
 
-    try:
-        print("Starting polling...")
-        await app.updater.start_polling(drop_pending_updates=True)
-        print("Polling started, bot is running!")
-        # Keep the bot running indefinitely
-        while True:
-            await asyncio.sleep(1)
+        # Test connection before full startup
+        try:
+            # Test bot connection with timeout
+            await asyncio.wait_for(app.bot.get_me(), timeout=10.0)
+            logger.info("Telegram connection test passed")
+        except asyncio.TimeoutError:
+            logger.error("Telegram connection test timed out")
+            raise Exception("Failed to connect to Telegram API")
+        except Exception as e:
+            logger.error("Telegram connection test failed: %s", e)
+            raise
+
+        if settings.ocm_sync_interval_s > 0:
+            sync_task = asyncio.create_task(run_ocm_sync(app))
+        if settings.precompute_interval_s > 0:
+            precompute_task = asyncio.create_task(run_precompute(app))
+
+        if settings.bot_mode == "webhook":
+            await register_webhook(app, settings)
+            logger.info("Webhook mode, bot is running")
+        else:
+            await app.updater.start_polling(drop_pending_updates=True)
+            logger.info("Polling started, bot is running")
+        # Updates are handled by the application's tasks until this task is cancelled
+        await asyncio.Event().wait()
     except Exception as e:
-        print(f"Error during polling: {e}")
+        logger.exception("Error while running: %s", e)
         raise
     finally:
-        print("Stopping bot...")
-        await app.updater.stop()
-        await app.stop()
+        logger.info("Stopping bot")
+        if sync_task is not None:
+            sync_task.cancel()
+        if precompute_task is not None:
+            precompute_task.cancel()
+        lag_task.cancel()
+        if app.updater.running:
+            await app.updater.stop()
+        if app.running:
+            await app.stop()
         await app.shutdown()
-        print("Bot stopped")
-
+        await runner.cleanup()
+        await app.bot_data["http_session"].close()
+        await asyncio.to_thread(app.bot_data["db_writer"].close)
+        app.bot_data["db_readers"].close()
+        logger.info("Bot stopped")
 
 if __name__ == "__main__":
     asyncio.run(run_bot())
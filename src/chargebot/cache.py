@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from .utils.geo import PointColumns, haversine_km
+
+
+Coords = Callable[[dict[str, Any]], tuple[float, float]]
+Fetch = Callable[..., Awaitable[list[dict[str, Any]]]]
+
+
+@dataclass
+class _Entry:
+    expires_at: float
+    items: list[dict[str, Any]]
+    points: PointColumns
+    size_bytes: int
+    # Set when the provider hit its result cap: only stations this close to the cell centre are known
+    covered_km: float | None = None
+
+
+class GeoCellCache:
+    """
+    In-process TTL + LRU cache for provider responses, keyed by a coarse
+    lat/lon grid cell plus the search radius and the result cap it was fetched with.
+
+    On a miss the provider is queried from the cell centre with the radius
+    widened by the cell's half-diagonal, so the cached result is a superset of
+    what any point inside the cell needs. Hits are filtered locally.
+
+    Providers cap how many stations they return. When the superset comes
+    back at the cap it only holds the stations nearest the centre, so it
+    answers just the searches whose circle lies within the farthest of them;
+    the others go to the provider from the user's own point, uncached.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_s: float = 300.0,
+        cell_deg: float = 0.1,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        superset_max_results: int = 100,
+    ) -> None:
+        self.ttl_s = ttl_s
+        self.cell_deg = cell_deg
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.superset_max_results = superset_max_results
+        self.hits = 0
+        self.misses = 0
+        # Misses because the cell's capped superset can't answer the search
+        self.partial_misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._bytes = 0
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def _cell_center(self, cell: tuple[int, int]) -> tuple[float, float]:
+        return (cell[0] + 0.5) * self.cell_deg, (cell[1] + 0.5) * self.cell_deg
+
+    def _cell_half_diagonal_km(self, cell: tuple[int, int]) -> float:
+        c_lat, c_lon = self._cell_center(cell)
+        # The corner nearer the equator is the farthest one in km
+        corner_lat = c_lat - math.copysign(self.cell_deg / 2, c_lat)
+        return haversine_km(c_lat, c_lon, corner_lat, c_lon + self.cell_deg / 2)
+
+    async def fetch(
+        self,
+        provider: str,
+        fetch: Fetch,
+        coords: Coords,
+        *,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        max_results: int,
+        limit: int | None = None,
+        **kwargs: Any,
+    ) -> list[dict[str, Any]]:
+        """
+        Answer a fetch_nearby call from the cache, querying the provider on a
+        miss. limit is the most results the provider returns per request.
+        """
+        cell = self._cell(lat, lon)
+        requested = max(max_results, self.superset_max_results)
+        if limit is not None:
+            requested = min(requested, limit)
+        # An entry fetched with a smaller cap can't stand in for a larger one
+        key = (provider, cell, round(radius_km, 1), requested)
+        c_lat, c_lon = self._cell_center(cell)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > now:
+            self._entries.move_to_end(key)
+            if self._covers(entry, c_lat, c_lon, lat, lon, radius_km):
+                self.hits += 1
+            else:
+                self.misses += 1
+        else:
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            items = await fetch(
+                lat=c_lat,
+                lon=c_lon,
+                radius_km=radius_km + self._cell_half_diagonal_km(cell),
+                max_results=requested,
+                **kwargs,
+            )
+            entry = self._store(key, items, coords, covered_from=(c_lat, c_lon) if len(items) >= requested else None)
+
+        if not self._covers(entry, c_lat, c_lon, lat, lon, radius_km):
+            self.partial_misses += 1
+            return await fetch(lat=lat, lon=lon, radius_km=radius_km, max_results=max_results, **kwargs)
+        return [entry.items[i] for _, i in entry.points.nearest(lat, lon, radius_km, max_results)]
+
+    @staticmethod
+    def _covers(entry: _Entry, c_lat: float, c_lon: float, lat: float, lon: float, radius_km: float) -> bool:
+        return entry.covered_km is None or haversine_km(c_lat, c_lon, lat, lon) + radius_km <= entry.covered_km
+
+    def _store(
+        self,
+        key: tuple,
+        items: list[dict[str, Any]],
+        coords: Coords,
+        *,
+        covered_from: tuple[float, float] | None = None,
+    ) -> _Entry:
+        """covered_from is the query point of a capped response, whose coverage is then measured."""
+        kept: list[dict[str, Any]] = []
+        points = PointColumns()
+        covered_km = 0.0 if covered_from is not None else None
+        for item in items:
+            try:
+                item_lat, item_lon = coords(item)
+                points.append(item_lat, item_lon)
+            except (KeyError, TypeError, ValueError):
+                continue
+            kept.append(item)
+            if covered_from is not None:
+                covered_km = max(covered_km, haversine_km(*covered_from, item_lat, item_lon))
+        size = len(json.dumps(kept, default=str, ensure_ascii=False))
+        entry = _Entry(time.monotonic() + self.ttl_s, kept, points, size, covered_km)
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = entry
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+        return entry
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size_bytes
+
+    def invalidate(self, provider: str) -> int:
+        """Drop every cached response of a provider. Returns how many entries were dropped."""
+        keys = [key for key in self._entries if key[0] == provider]
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "partial_misses": self.partial_misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -1,3 +1,5 @@
+import hashlib
+import hmac
 import os
 from dataclasses import dataclass
 from pathlib import Path
@@ -8,10 +10,50 @@ from dotenv import load_dotenv, find_dotenv
 class Settings:
     telegram_token: str
     db_url: str
+    http_listen: str
+    http_port: int
+    bot_mode: str
+    webhook_url: str | None
+    webhook_path: str
+    webhook_secret: str
+    webhook_max_connections: int
     openchargemap_api_key: str | None
     plugshare_api_key: str | None
     default_search_radius_km: float
     max_results: int
+    ocm_timeout_s: float
+    ocm_connect_timeout_s: float
+    ocm_read_timeout_s: float
+    ocm_retries: int
+    ocm_retry_backoff_s: float
+    ocm_hedge_quantile: float
+    plugshare_timeout_s: float
+    belarus_timeout_s: float
+    malanka_timeout_s: float
+    enabled_providers: tuple[str, ...]
+    http_pool_limit: int
+    http_pool_limit_per_host: int
+    http_dns_cache_ttl_s: int
+    http_keepalive_s: float
+    cache_ttl_s: float
+    cache_cell_deg: float
+    cache_max_entries: int
+    cache_max_bytes: int
+    local_max_age_s: float
+    ocm_sync_interval_s: float
+    ocm_sync_page_size: int
+    db_read_pool_size: int
+    precompute_interval_s: float
+    breaker_window: int
+    breaker_failure_rate: float
+    breaker_cooldown_s: float
+    breaker_max_cooldown_s: float
+    log_level: str
+    log_format: str
+    tg_global_rate: float
+    tg_chat_rate: float
+    tg_group_rate_per_min: float
+    tg_max_retries: int
 
 
 def load_settings() -> Settings:
@@ -32,6 +74,31 @@ def load_settings() -> Settings:
         raise RuntimeError("TELEGRAM_BOT_TOKEN is not set")
 
     db_url = os.getenv("DATABASE_URL", "sqlite:///data/chargebot.db").strip()
+    # The station store, its writer thread and read pool are SQLite-only
+    if not db_url.startswith("sqlite:///"):
+        scheme = db_url.split(":", 1)[0]
+        raise RuntimeError(f"DATABASE_URL must be a sqlite:/// URL, got a '{scheme}' URL")
+
+    # HTTP server on the bot's event loop: health checks, /metrics and the webhook route
+    http_listen = os.getenv("HTTP_LISTEN", "0.0.0.0").strip()
+    http_port = int(os.getenv("PORT", "8000"))
+
+    # How updates arrive: long polling, or webhook POSTs to an aiohttp server in the bot's loop.
+    # WEBHOOK_URL is the public base URL Telegram calls (behind a proxy/load balancer if needed);
+    # replicas behind one URL must share WEBHOOK_SECRET
+    bot_mode = os.getenv("BOT_MODE", "polling").strip().lower()
+    if bot_mode not in ("polling", "webhook"):
+        raise RuntimeError(f"BOT_MODE must be 'polling' or 'webhook', got '{bot_mode}'")
+    webhook_url = os.getenv("WEBHOOK_URL", "").strip().rstrip("/") or None
+    if bot_mode == "webhook" and not webhook_url:
+        raise RuntimeError("WEBHOOK_URL is required when BOT_MODE=webhook")
+    webhook_path = "/" + os.getenv("WEBHOOK_PATH", "/telegram").strip().strip("/")
+    # Derived from the token when unset, so every replica behind one URL registers and checks the same secret
+    webhook_secret = os.getenv("WEBHOOK_SECRET", "").strip() or hmac.new(
+        telegram_token.encode(), b"chargebot-webhook-secret", hashlib.sha256
+    ).hexdigest()
+    # Simultaneous connections Telegram may open to deliver updates (1-100)
+    webhook_max_connections = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
 
     openchargemap_api_key = os.getenv("OCM_API_KEY", None)
     plugshare_api_key = os.getenv("PLUGSHARE_API_KEY", None)
@@ -39,13 +106,117 @@ def load_settings() -> Settings:
     default_search_radius_km = float(os.getenv("DEFAULT_RADIUS_KM", "50"))
     max_results = int(os.getenv("MAX_RESULTS", "10"))
 
+    # Per-provider deadlines: the bot answers with whatever arrived in time
+    ocm_timeout_s = float(os.getenv("OCM_TIMEOUT_S", "8"))
+    plugshare_timeout_s = float(os.getenv("PLUGSHARE_TIMEOUT_S", "3"))
+    belarus_timeout_s = float(os.getenv("BELARUS_TIMEOUT_S", "2"))
+    malanka_timeout_s = float(os.getenv("MALANKA_TIMEOUT_S", "5"))
+
+    # OpenChargeMap requests within its deadline: per-attempt connect/read timeouts, retries of
+    # transient errors with jittered backoff, and a hedged second request once the first is slower
+    # than this quantile of recent answers (0 disables hedging)
+    ocm_connect_timeout_s = float(os.getenv("OCM_CONNECT_TIMEOUT_S", "1.5"))
+    ocm_read_timeout_s = float(os.getenv("OCM_READ_TIMEOUT_S", "5"))
+    ocm_retries = int(os.getenv("OCM_RETRIES", "2"))
+    ocm_retry_backoff_s = float(os.getenv("OCM_RETRY_BACKOFF_S", "0.2"))
+    ocm_hedge_quantile = float(os.getenv("OCM_HEDGE_QUANTILE", "0.95"))
+
+    # Comma-separated provider names from providers.registry
+    enabled_providers = tuple(
+        name.strip()
+        for name in os.getenv("PROVIDERS", "openchargemap,plugshare,belarus_networks").split(",")
+        if name.strip()
+    )
+
+    # Shared HTTP connection pool used by all providers
+    http_pool_limit = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+    http_pool_limit_per_host = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+    http_dns_cache_ttl_s = int(os.getenv("HTTP_DNS_CACHE_TTL_S", "300"))
+    http_keepalive_s = float(os.getenv("HTTP_KEEPALIVE_S", "30"))
+
+    # Geo-cell cache in front of the network providers
+    cache_ttl_s = float(os.getenv("CACHE_TTL_S", "300"))
+    cache_cell_deg = float(os.getenv("CACHE_CELL_DEG", "0.1"))
+    cache_max_entries = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    cache_max_bytes = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    # Stored stations younger than this are served without querying providers
+    local_max_age_s = float(os.getenv("LOCAL_MAX_AGE_S", "900"))
+
+    # Background bulk sync of the Belarus OpenChargeMap dataset (0 disables it)
+    ocm_sync_interval_s = float(os.getenv("OCM_SYNC_INTERVAL_S", "21600"))
+    ocm_sync_page_size = int(os.getenv("OCM_SYNC_PAGE_SIZE", "500"))
+
+    # Read-only SQLite connections for queries (writes go through one writer thread)
+    db_read_pool_size = int(os.getenv("DB_READ_POOL_SIZE", "4"))
+
+    # Replies for the fixed city points are rebuilt in the background this often (0 disables)
+    precompute_interval_s = float(os.getenv("PRECOMPUTE_INTERVAL_S", "600"))
+
+    # Per-provider circuit breakers: open after this failure (or slow-call) rate over the last N calls,
+    # cooldown doubles on every re-open up to the maximum
+    breaker_window = int(os.getenv("BREAKER_WINDOW", "20"))
+    breaker_failure_rate = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    breaker_cooldown_s = float(os.getenv("BREAKER_COOLDOWN_S", "30"))
+    breaker_max_cooldown_s = float(os.getenv("BREAKER_MAX_COOLDOWN_S", "600"))
+
+    # Logging: per-request details are DEBUG; LOG_FORMAT is json (one object per line) or text
+    log_level = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+    log_format = os.getenv("LOG_FORMAT", "json").strip().lower()
+
+    # Outbound Telegram flood limits (messages per second globally / per private chat)
+    tg_global_rate = float(os.getenv("TG_GLOBAL_RATE", "30"))
+    tg_chat_rate = float(os.getenv("TG_CHAT_RATE", "1"))
+    tg_group_rate_per_min = float(os.getenv("TG_GROUP_RATE_PER_MIN", "20"))
+    tg_max_retries = int(os.getenv("TG_MAX_RETRIES", "3"))
+
     return Settings(
         telegram_token=telegram_token,
         db_url=db_url,
+        http_listen=http_listen,
+        http_port=http_port,
+        bot_mode=bot_mode,
+        webhook_url=webhook_url,
+        webhook_path=webhook_path,
+        webhook_secret=webhook_secret,
+        webhook_max_connections=webhook_max_connections,
         openchargemap_api_key=openchargemap_api_key,
         plugshare_api_key=plugshare_api_key,
         default_search_radius_km=default_search_radius_km,
         max_results=max_results,
+        ocm_timeout_s=ocm_timeout_s,
+        ocm_connect_timeout_s=ocm_connect_timeout_s,
+        ocm_read_timeout_s=ocm_read_timeout_s,
+        ocm_retries=ocm_retries,
+        ocm_retry_backoff_s=ocm_retry_backoff_s,
+        ocm_hedge_quantile=ocm_hedge_quantile,
+        plugshare_timeout_s=plugshare_timeout_s,
+        belarus_timeout_s=belarus_timeout_s,
+        malanka_timeout_s=malanka_timeout_s,
+        enabled_providers=enabled_providers,
+        http_pool_limit=http_pool_limit,
+        http_pool_limit_per_host=http_pool_limit_per_host,
+        http_dns_cache_ttl_s=http_dns_cache_ttl_s,
+        http_keepalive_s=http_keepalive_s,
+        cache_ttl_s=cache_ttl_s,
+        cache_cell_deg=cache_cell_deg,
+        cache_max_entries=cache_max_entries,
+        cache_max_bytes=cache_max_bytes,
+        local_max_age_s=local_max_age_s,
+        ocm_sync_interval_s=ocm_sync_interval_s,
+        ocm_sync_page_size=ocm_sync_page_size,
+        db_read_pool_size=db_read_pool_size,
+        precompute_interval_s=precompute_interval_s,
+        breaker_window=breaker_window,
+        breaker_failure_rate=breaker_failure_rate,
+        breaker_cooldown_s=breaker_cooldown_s,
+        breaker_max_cooldown_s=breaker_max_cooldown_s,
+        log_level=log_level,
+        log_format=log_format,
+        tg_global_rate=tg_global_rate,
+        tg_chat_rate=tg_chat_rate,
+        tg_group_rate_per_min=tg_group_rate_per_min,
+        tg_max_retries=tg_max_retries,
     )
 
 
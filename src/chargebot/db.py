@@ -1,9 +1,20 @@
+import asyncio
+import logging
 import os
+import queue
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Any, Callable, Iterable, Optional
 
+from .metrics import DB_WRITE_LATENCY
+from .models import Station
+from .utils.geo import bbox_deltas, haversine_km, nearest_k
+
+
+logger = logging.getLogger(__name__)
 
 DB_PRAGMA_STATEMENTS: list[tuple[str, tuple]] = [
     ("PRAGMA journal_mode=WAL;", tuple()),
@@ -38,19 +49,128 @@ def init_db(db_url: str) -> None:
                 power_kw REAL,
                 status TEXT,
                 last_seen_utc TEXT,
+                fetched_at REAL,
+                source TEXT,
                 UNIQUE(ext_id)
             );
             """
         )
+        # Columns added after the first release
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(stations);")}
+        for column, column_type in (("fetched_at", "REAL"), ("source", "TEXT")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE stations ADD COLUMN {column} {column_type};")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_stations (
+                id INTEGER PRIMARY KEY,
+                ext_id TEXT NOT NULL,
+                name TEXT,
+                address TEXT,
+                operator TEXT,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                power_kw REAL,
+                source TEXT NOT NULL DEFAULT 'telegram',
+                submitted_by INTEGER,
+                moderation_status TEXT NOT NULL DEFAULT 'pending',
+                created_utc TEXT NOT NULL,
+                UNIQUE(ext_id)
+            );
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
         conn.execute(
             """
             CREATE INDEX IF NOT EXISTS idx_stations_lat_lon
             ON stations(latitude, longitude);
             """
         )
+        # Circles a provider search has answered completely: (latitude, longitude, radius_km) per source
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS coverage (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                radius_km REAL NOT NULL,
+                refreshed_at REAL NOT NULL
+            );
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_coverage_source_lat_lon
+            ON coverage(source, latitude, longitude);
+            """
+        )
+        # A submission is searchable while pending; rejecting it removes its copy from the station store
+        conn.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS user_stations_rejected_au
+            AFTER UPDATE OF moderation_status ON user_stations
+            WHEN new.moderation_status = 'rejected' BEGIN
+                DELETE FROM stations WHERE ext_id = new.ext_id;
+            END;
+            """
+        )
+        # Rejections made before the trigger existed
+        conn.execute(
+            "DELETE FROM stations WHERE ext_id IN (SELECT ext_id FROM user_stations WHERE moderation_status = 'rejected');"
+        )
+        _init_rtree(conn)
         conn.commit()
 
 
+def _init_rtree(conn: sqlite3.Connection) -> None:
+    """
+    Create the R*Tree spatial index over stations and the triggers that keep it
+    in sync. Skipped if this SQLite build lacks the rtree module; queries then
+    fall back to the lat/lon composite index.
+    """
+    try:
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS stations_rtree
+            USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+            """
+        )
+    except sqlite3.OperationalError as e:
+        logger.warning("R*Tree unavailable, using lat/lon index only: %s", e)
+        return
+    conn.executescript(
+        """
+        CREATE TRIGGER IF NOT EXISTS stations_rtree_ai AFTER INSERT ON stations BEGIN
+            INSERT INTO stations_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END;
+        CREATE TRIGGER IF NOT EXISTS stations_rtree_au AFTER UPDATE OF latitude, longitude ON stations BEGIN
+            UPDATE stations_rtree
+            SET min_lat = new.latitude, max_lat = new.latitude, min_lon = new.longitude, max_lon = new.longitude
+            WHERE id = new.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS stations_rtree_ad AFTER DELETE ON stations BEGIN
+            DELETE FROM stations_rtree WHERE id = old.id;
+        END;
+        """
+    )
+    # Backfill rows written before the index existed
+    conn.execute(
+        """
+        INSERT INTO stations_rtree
+        SELECT id, latitude, latitude, longitude, longitude FROM stations
+        WHERE id NOT IN (SELECT id FROM stations_rtree);
+        """
+    )
+
+
 @contextmanager
 def get_conn(db_url: str):
     db_file = ensure_sqlite_path(db_url)
@@ -64,31 +184,392 @@ def get_conn(db_url: str):
         conn.close()
 
 
+UPSERT_STATION_SQL = """
+    INSERT INTO stations (ext_id, name, address, operator, latitude, longitude, power_kw, status, last_seen_utc, source, fetched_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(ext_id) DO UPDATE SET
+        name=excluded.name,
+        address=excluded.address,
+        operator=excluded.operator,
+        latitude=excluded.latitude,
+        longitude=excluded.longitude,
+        power_kw=excluded.power_kw,
+        status=excluded.status,
+        last_seen_utc=excluded.last_seen_utc,
+        source=excluded.source,
+        fetched_at=excluded.fetched_at
+    ;
+"""
+
+STATION_COLUMNS = ("ext_id", "name", "address", "operator", "latitude", "longitude", "power_kw", "status", "last_seen_utc", "source", "fetched_at")
+
+
+def _upsert_stations(conn: sqlite3.Connection, rows: Iterable[tuple]) -> int:
+    fetched_at = time.time()
+    params = [(*row, fetched_at) for row in rows]
+    conn.executemany(UPSERT_STATION_SQL, params)
+    return len(params)
+
+
+def _mark_source_fresh(conn: sqlite3.Connection, source: str, fetched_at: float) -> None:
+    conn.execute(
+        "UPDATE stations SET fetched_at = ? WHERE source = ? AND (fetched_at IS NULL OR fetched_at < ?);",
+        (fetched_at, source, fetched_at),
+    )
+
+
+def _store_area(
+    conn: sqlite3.Connection, source: str, lat: float, lon: float, radius_km: float, rows: list[tuple]
+) -> int:
+    """
+    Upsert one provider's answer to a search and record the circle it
+    covers: every station of the source within radius_km of (lat, lon) is
+    in rows. Stored stations of the source inside the circle that rows no
+    longer include were removed upstream and are deleted; coverage the new
+    circle contains is dropped.
+    """
+    written = _upsert_stations(conn, rows)
+    d_lat, d_lon = bbox_deltas(lat, radius_km)
+    returned = {row[0] for row in rows}
+    gone = [
+        (row_id,)
+        for row_id, ext_id, s_lat, s_lon in conn.execute(
+            """
+            SELECT id, ext_id, latitude, longitude FROM stations
+            WHERE source = ? AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?;
+            """,
+            (source, lat - d_lat, lat + d_lat, lon - d_lon, lon + d_lon),
+        )
+        if ext_id not in returned and haversine_km(lat, lon, s_lat, s_lon) < radius_km - COVERAGE_TOLERANCE_KM
+    ]
+    conn.executemany("DELETE FROM stations WHERE id = ?;", gone)
+    inside = [
+        (row_id,)
+        for row_id, c_lat, c_lon, c_radius in conn.execute(
+            """
+            SELECT id, latitude, longitude, radius_km FROM coverage
+            WHERE source = ? AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?;
+            """,
+            (source, lat - d_lat, lat + d_lat, lon - d_lon, lon + d_lon),
+        )
+        if haversine_km(lat, lon, c_lat, c_lon) + c_radius <= radius_km
+    ]
+    conn.executemany("DELETE FROM coverage WHERE id = ?;", inside)
+    conn.execute(
+        "INSERT INTO coverage (source, latitude, longitude, radius_km, refreshed_at) VALUES (?, ?, ?, ?, ?);",
+        (source, lat, lon, radius_km, time.time()),
+    )
+    return written
+
+
+# Slack for rounding between distance computations when comparing circles
+COVERAGE_TOLERANCE_KM = 0.001
+
+
+def _coverage_at(conn: sqlite3.Connection, lat: float, lon: float, radius_km: float, reach_km: float) -> dict[str, float]:
+    """
+    Sources whose recorded coverage contains the radius_km circle around
+    (lat, lon), with the latest refresh time among the covering circles.
+    reach_km bounds the radius of any recorded circle.
+    """
+    d_lat, d_lon = bbox_deltas(lat, reach_km)
+    covered: dict[str, float] = {}
+    for source, c_lat, c_lon, c_radius, refreshed_at in conn.execute(
+        """
+        SELECT source, latitude, longitude, radius_km, refreshed_at FROM coverage
+        WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?;
+        """,
+        (lat - d_lat, lat + d_lat, lon - d_lon, lon + d_lon),
+    ):
+        if haversine_km(lat, lon, c_lat, c_lon) + radius_km <= c_radius + COVERAGE_TOLERANCE_KM:
+            covered[source] = max(covered.get(source, 0.0), refreshed_at)
+    return covered
+
+
+def _get_sync_state(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM sync_state WHERE key = ?;", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_sync_state(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute(
+        "INSERT INTO sync_state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value;",
+        (key, value),
+    )
+
+
+def _insert_user_station(conn: sqlite3.Connection, station: dict[str, Any], source: str, submitted_by: Optional[int]) -> None:
+    conn.execute(
+        """
+        INSERT INTO user_stations (ext_id, name, address, operator, latitude, longitude, power_kw, source, submitted_by, created_utc)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'));
+        """,
+        (
+            station["id"],
+            station.get("name"),
+            station.get("address"),
+            station.get("operator"),
+            station["latitude"],
+            station["longitude"],
+            station.get("power_kw"),
+            source,
+            submitted_by,
+        ),
+    )
+
+
+def _list_user_stations(conn: sqlite3.Connection) -> list[dict[str, Any]]:
+    rows = conn.execute(
+        """
+        SELECT ext_id, name, address, operator, latitude, longitude, power_kw
+        FROM user_stations WHERE moderation_status != 'rejected' ORDER BY id;
+        """
+    ).fetchall()
+    return [
+        {
+            "id": ext_id,
+            "name": name,
+            "address": address,
+            "latitude": lat,
+            "longitude": lon,
+            "power_kw": power_kw,
+            "operator": operator,
+            "network": "user",
+        }
+        for ext_id, name, address, operator, lat, lon, power_kw in rows
+    ]
+
+
+def _query_nearby(conn: sqlite3.Connection, lat: float, lon: float, radius_km: float, limit: int) -> list[Station]:
+    d_lat, d_lon = bbox_deltas(lat, radius_km)
+    bbox = (lat - d_lat, lat + d_lat, lon - d_lon, lon + d_lon)
+    select = ", ".join(f"s.{c}" for c in STATION_COLUMNS)
+
+    has_rtree = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stations_rtree';"
+    ).fetchone()
+    if has_rtree:
+        rows = conn.execute(
+            f"""
+            SELECT {select} FROM stations_rtree r JOIN stations s ON s.id = r.id
+            WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?;
+            """,
+            bbox,
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            f"""
+            SELECT {select} FROM stations s
+            WHERE s.latitude BETWEEN ? AND ? AND s.longitude BETWEEN ? AND ?;
+            """,
+            bbox,
+        ).fetchall()
+
+    return [
+        Station.from_row(row, distance_km=d)
+        for d, row in nearest_k(rows, lambda row: (row[4], row[5]), lat, lon, radius_km, limit)
+    ]
+
+
 def upsert_stations(
     db_url: str,
-    rows: Iterable[tuple[str, Optional[str], Optional[str], Optional[str], float, float, Optional[float], Optional[str], Optional[str]]],
-) -> None:
+    rows: Iterable[tuple[str, Optional[str], Optional[str], Optional[str], float, float, Optional[float], Optional[str], Optional[str], Optional[str]]],
+) -> int:
     """
-    Upsert stations by ext_id.
-    Row order: ext_id, name, address, operator, lat, lon, power_kw, status, last_seen_utc
+    Upsert stations by ext_id, stamping them with the current fetch time.
+    Row order: ext_id, name, address, operator, lat, lon, power_kw, status, last_seen_utc, source
+    Returns the number of rows written.
     """
     with get_conn(db_url) as conn:
-        conn.executemany(
-            """
-            INSERT INTO stations (ext_id, name, address, operator, latitude, longitude, power_kw, status, last_seen_utc)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(ext_id) DO UPDATE SET
-                name=excluded.name,
-                address=excluded.address,
-                operator=excluded.operator,
-                latitude=excluded.latitude,
-                longitude=excluded.longitude,
-                power_kw=excluded.power_kw,
-                status=excluded.status,
-                last_seen_utc=excluded.last_seen_utc
-            ;
-            """,
-            list(rows),
-        )
+        return _upsert_stations(conn, rows)
+
+
+def mark_source_fresh(db_url: str, source: str, fetched_at: float) -> None:
+    """Stamp every stored station of a source as confirmed current at fetched_at."""
+    with get_conn(db_url) as conn:
+        _mark_source_fresh(conn, source, fetched_at)
+
+
+def get_sync_state(db_url: str, key: str) -> Optional[str]:
+    with get_conn(db_url) as conn:
+        return _get_sync_state(conn, key)
+
+
+def set_sync_state(db_url: str, key: str, value: str) -> None:
+    with get_conn(db_url) as conn:
+        _set_sync_state(conn, key, value)
+
+
+def query_nearby(db_url: str, lat: float, lon: float, radius_km: float, limit: int) -> list[Station]:
+    """
+    Return up to `limit` stored stations within radius_km of (lat, lon), nearest first.
+    Candidates come from a bounding-box lookup on the R*Tree and are then
+    filtered by exact distance. Stations carry distance_km and fetched_at
+    (unix time of the last refresh).
+    """
+    with get_conn(db_url) as conn:
+        return _query_nearby(conn, lat, lon, radius_km, limit)
+
+
+class StationWriter:
+    """
+    Single writer thread owning one persistent connection.
+
+    Writes are queued from the event loop and return asyncio futures. The
+    thread drains whatever is queued and commits it as one transaction, so
+    concurrent requests share a single fsync. If a merged transaction fails,
+    its jobs are retried one by one so only the bad write reports an error.
+    """
+
+    def __init__(self, db_url: str, *, max_batch_jobs: int = 256) -> None:
+        self._db_file = ensure_sqlite_path(db_url)
+        self._max_batch_jobs = max_batch_jobs
+        self._jobs: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def close(self) -> None:
+        """Flush queued writes and stop the thread (blocking)."""
+        if self._thread.is_alive():
+            self._jobs.put(None)
+            self._thread.join()
+
+    @property
+    def pending(self) -> int:
+        return self._jobs.qsize()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._jobs.put((fn, args, loop, future))
+        return future
+
+    def upsert_stations(self, rows: Iterable[tuple]) -> asyncio.Future:
+        """Queue an upsert of Station.as_row() tuples; resolves to the row count."""
+        return self._submit(_upsert_stations, list(rows))
+
+    def store_area(self, source: str, lat: float, lon: float, radius_km: float, rows: Iterable[tuple]) -> asyncio.Future:
+        """Queue _store_area: one provider's complete answer for the radius_km circle around (lat, lon)."""
+        return self._submit(_store_area, source, lat, lon, radius_km, list(rows))
+
+    def mark_source_fresh(self, source: str, fetched_at: float) -> asyncio.Future:
+        return self._submit(_mark_source_fresh, source, fetched_at)
+
+    def set_sync_state(self, key: str, value: str) -> asyncio.Future:
+        return self._submit(_set_sync_state, key, value)
+
+    def insert_user_station(self, station: dict[str, Any], *, source: str = "telegram", submitted_by: Optional[int] = None) -> asyncio.Future:
+        """Persist a user-submitted station (pending moderation, visible unless rejected)."""
+        return self._submit(_insert_user_station, station, source, submitted_by)
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(self._db_file, isolation_level=None)
+        for sql, params in DB_PRAGMA_STATEMENTS:
+            conn.execute(sql)
+        try:
+            stop = False
+            while not stop:
+                batch = [self._jobs.get()]
+                while len(batch) < self._max_batch_jobs:
+                    try:
+                        batch.append(self._jobs.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    stop = True
+                    batch = [job for job in batch if job is not None]
+                if batch:
+                    self._write_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list) -> None:
+        try:
+            t0 = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE;")
+            results = [fn(conn, *args) for fn, args, _, _ in batch]
+            conn.execute("COMMIT;")
+            DB_WRITE_LATENCY.observe(time.perf_counter() - t0)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK;")
+            if len(batch) > 1:
+                for job in batch:
+                    self._write_batch(conn, [job])
+                return
+            _, _, loop, future = batch[0]
+            _resolve(loop, future, error=e)
+            return
+        for (_, _, loop, future), result in zip(batch, results):
+            _resolve(loop, future, result=result)
+
+
+def _resolve(loop: asyncio.AbstractEventLoop, future: asyncio.Future, *, result: Any = None, error: BaseException | None = None) -> None:
+    def apply() -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    try:
+        loop.call_soon_threadsafe(apply)
+    except RuntimeError:
+        # Event loop already closed; nobody is waiting for the result
+        pass
+
+
+def _ping(conn: sqlite3.Connection) -> None:
+    conn.execute("SELECT 1 FROM stations LIMIT 1").fetchall()
+
+
+class ReadPool:
+    """Small pool of query-only connections; queries run in worker threads."""
+
+    def __init__(self, db_url: str, size: int = 4) -> None:
+        db_file = ensure_sqlite_path(db_url)
+        self._conns: queue.Queue = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(db_file, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON;")
+            self._conns.put(conn)
+        self._size = size
+
+    def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        conn = self._conns.get()
+        try:
+            return fn(conn, *args)
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._conns.put(conn)
+
+    async def query_nearby(self, lat: float, lon: float, radius_km: float, limit: int) -> list[Station]:
+        """Async query_nearby over a pooled connection."""
+        return await asyncio.to_thread(self._call, _query_nearby, lat, lon, radius_km, limit)
+
+    async def coverage_at(self, lat: float, lon: float, radius_km: float, reach_km: float) -> dict[str, float]:
+        """Async _coverage_at over a pooled connection."""
+        return await asyncio.to_thread(self._call, _coverage_at, lat, lon, radius_km, reach_km)
+
+    async def get_sync_state(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._call, _get_sync_state, key)
+
+    async def list_user_stations(self) -> list[dict[str, Any]]:
+        """User-submitted stations that haven't been rejected by moderation."""
+        return await asyncio.to_thread(self._call, _list_user_stations)
 
+    async def ping(self) -> None:
+        """Raise if the store can't be read (readiness check)."""
+        await asyncio.to_thread(self._call, _ping)
 
+    def close(self) -> None:
+        for _ in range(self._size):
+            self._conns.get().close()
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import bisect
+import csv
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+DEFAULT_PATH = Path(__file__).resolve().parent / "data" / "by_settlements.tsv"
+
+# Letters that differ between the Russian and Belarusian alphabets or are often typed without diacritics
+_FOLD = str.maketrans({"ё": "е", "ў": "у", "і": "и", "'": None, "ʼ": None, "’": None, "-": " "})
+
+# Shorter input isn't treated as a prefix by lookup (autocomplete can still use complete())
+MIN_PREFIX_LEN = 3
+
+_TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya", "і": "i", "ў": "u", "'": "",
+}
+# Belarusian г is a fricative and is romanized as h (Гомель -> Homel)
+_TRANSLIT_BE = {**_TRANSLIT, "г": "h"}
+
+
+def normalize(text: str) -> str:
+    """Lookup key: case-folded, ё/ў/і folded, Latin diacritics and punctuation dropped."""
+    text = unicodedata.normalize("NFC", text).casefold().translate(_FOLD)
+    chars = []
+    for ch in text:
+        if ch < "Ѐ" and not ch.isascii():
+            # č -> c, ŭ -> u, ĺ -> l; Cyrillic й keeps its breve
+            ch = "".join(c for c in unicodedata.normalize("NFD", ch) if not unicodedata.combining(c))
+        chars.append(ch)
+    return " ".join("".join(chars).split())
+
+
+def _translit(name: str, table: dict[str, str]) -> str:
+    return "".join(table.get(ch, ch) for ch in name.casefold())
+
+
+@dataclass(frozen=True)
+class Settlement:
+    name_ru: str
+    name_be: str
+    name_lat: str
+    lat: float
+    lon: float
+    population: int
+
+    @property
+    def coords(self) -> tuple[float, float]:
+        return self.lat, self.lon
+
+
+def _deletes(word: str, depth: int) -> set[str]:
+    """All strings obtained from word by removing up to depth characters."""
+    found = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def _max_edits(word: str) -> int:
+    # Short names tolerate fewer typos, otherwise everything matches everything
+    if len(word) < 4:
+        return 0
+    if len(word) < 7:
+        return 1
+    return 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (adjacent transpositions count as one
+    edit), giving up with limit + 1 as soon as it is exceeded.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Only cells within `limit` of the diagonal can stay under the limit
+    big = limit + 1
+    n = len(b)
+    prev2: list[int] = []
+    prev = [j if j <= limit else big for j in range(n + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        cur = [big] * (n + 1)
+        if i <= limit:
+            cur[0] = i
+        row_min = cur[0]
+        for j in range(max(1, i - limit), min(n, i + limit) + 1):
+            cb = b[j - 1]
+            d = prev[j - 1] if ca == cb else prev[j - 1] + 1
+            if prev[j] + 1 < d:
+                d = prev[j] + 1
+            if cur[j - 1] + 1 < d:
+                d = cur[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and prev2[j - 2] + 1 < d:
+                d = prev2[j - 2] + 1
+            cur[j] = d
+            if d < row_min:
+                row_min = d
+        if row_min > limit:
+            return big
+        prev2, prev = prev, cur
+    return min(prev[-1], big)
+
+
+class Gazetteer:
+    """
+    Offline settlement lookup by Russian, Belarusian or Latin spelling.
+
+    Every spelling (plus plain transliterations of the Cyrillic names) is
+    normalized into a key. Keys live in one sorted array, so prefix queries
+    are a bisect plus a short scan, and in a deletion index (keys with up to
+    two characters removed) that yields typo candidates without comparing
+    the query against every key.
+    """
+
+    def __init__(self, settlements: Iterable[Settlement]) -> None:
+        self.settlements = list(settlements)
+        pairs: set[tuple[str, int]] = set()
+        for idx, s in enumerate(self.settlements):
+            for spelling in (
+                s.name_ru,
+                s.name_be,
+                s.name_lat,
+                _translit(s.name_ru, _TRANSLIT),
+                _translit(s.name_be, _TRANSLIT_BE),
+            ):
+                key = normalize(spelling)
+                if key:
+                    pairs.add((key, idx))
+        ordered = sorted(pairs)
+        self._keys = [key for key, _ in ordered]
+        self._ids = [idx for _, idx in ordered]
+
+        self._deletion_index: dict[str, list[int]] = {}
+        for pos, key in enumerate(self._keys):
+            for variant in _deletes(key, _max_edits(key)):
+                self._deletion_index.setdefault(variant, []).append(pos)
+
+    @classmethod
+    def from_file(cls, path: Path | str = DEFAULT_PATH) -> "Gazetteer":
+        """Load a TSV with name_ru, name_be, name_lat, lat, lon, population columns; # lines are comments."""
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = csv.DictReader((line for line in f if not line.startswith("#")), delimiter="\t")
+            return cls(
+                Settlement(
+                    name_ru=row["name_ru"],
+                    name_be=row["name_be"],
+                    name_lat=row["name_lat"],
+                    lat=float(row["lat"]),
+                    lon=float(row["lon"]),
+                    population=int(row["population"] or 0),
+                )
+                for row in rows
+            )
+
+    def __len__(self) -> int:
+        return len(self.settlements)
+
+    def _rank(self, ids: Iterable[int]) -> list[Settlement]:
+        return sorted({i: self.settlements[i] for i in ids}.values(), key=lambda s: -s.population)
+
+    def exact(self, query: str) -> list[Settlement]:
+        key = normalize(query)
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_right(self._keys, key)
+        return self._rank(self._ids[lo:hi])
+
+    def complete(self, prefix: str, limit: int = 10) -> list[Settlement]:
+        """Settlements with a spelling starting with prefix, largest first (for autocomplete)."""
+        key = normalize(prefix)
+        if not key:
+            return []
+        lo = bisect.bisect_left(self._keys, key)
+        # Every key starting with the prefix sorts below prefix + the highest code point
+        hi = bisect.bisect_left(self._keys, key + "\U0010ffff", lo)
+        return self._rank(self._ids[lo:hi])[:limit]
+
+    def fuzzy(self, query: str, limit: int = 5) -> list[Settlement]:
+        """Settlements whose spelling is within a few typos of query, closest first."""
+        key = normalize(query)
+        max_edits = _max_edits(key)
+        if not max_edits:
+            return []
+        best: dict[int, int] = {}
+        seen: set[int] = set()
+        for variant in _deletes(key, max_edits):
+            for pos in self._deletion_index.get(variant, ()):
+                if pos in seen:
+                    continue
+                seen.add(pos)
+                idx = self._ids[pos]
+                d = edit_distance(key, self._keys[pos], max_edits)
+                if d <= max_edits and d < best.get(idx, max_edits + 1):
+                    best[idx] = d
+        ranked = sorted(best, key=lambda i: (best[i], -self.settlements[i].population))
+        return [self.settlements[i] for i in ranked[:limit]]
+
+    def lookup(self, query: str) -> Optional[Settlement]:
+        """Best match for a typed name: exact spelling, then prefix, then the closest typo match."""
+        found = self.exact(query)
+        if not found and len(normalize(query)) >= MIN_PREFIX_LEN:
+            found = self.complete(query, limit=1)
+        if not found:
+            found = self.fuzzy(query, limit=1)
+        return found[0] if found else None
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer() -> Gazetteer:
+    """The bundled gazetteer, loaded on first use."""
+    return Gazetteer.from_file()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Optional
+
+import aiohttp
+
+from .config import Settings
+from .metrics import HTTP_HEDGED, HTTP_RETRIES
+from .utils.retry import LatencyTracker, RetryPolicy, hedged, retry
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestOptions:
+    """
+    How get_json talks to one upstream: per-attempt connect and read
+    timeouts, retries for transient errors and optional hedging once the
+    first attempt is slower than hedge_quantile of recent successful ones.
+    name labels the metrics; latencies is shared by all calls with these options.
+    """
+
+    name: str
+    connect_timeout_s: float = 2.0
+    read_timeout_s: float = 10.0
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    hedge_quantile: Optional[float] = None
+    latencies: LatencyTracker = field(default_factory=LatencyTracker)
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge_quantile:
+            return None
+        return self.latencies.quantile(self.hedge_quantile)
+
+
+def is_transient(error: BaseException) -> bool:
+    """Errors worth another attempt: connection problems, timeouts, 5xx and 429."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+
+def create_http_session(settings: Settings) -> aiohttp.ClientSession:
+    """
+    Create the application-wide HTTP session shared by all providers.
+    Must be called from inside the running event loop.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=settings.http_pool_limit,
+        limit_per_host=settings.http_pool_limit_per_host,
+        ttl_dns_cache=settings.http_dns_cache_ttl_s,
+        keepalive_timeout=settings.http_keepalive_s,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=20),
+    )
+
+
+async def get_json(
+    http: aiohttp.ClientSession,
+    url: str,
+    *,
+    options: RequestOptions,
+    params: Optional[dict[str, str]] = None,
+    headers: Optional[dict[str, str]] = None,
+) -> Any:
+    """GET url and decode JSON, retrying and hedging as configured in options (GETs only: they're idempotent)."""
+    # No total limit: callers bound the whole call (provider deadline), sock_read bounds each stall
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=options.connect_timeout_s, sock_read=options.read_timeout_s)
+
+    async def attempt() -> Any:
+        t0 = time.perf_counter()
+        async with http.get(url, params=params, headers=headers, timeout=timeout) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        options.latencies.record(time.perf_counter() - t0)
+        return data
+
+    def on_retry(attempt_no: int, error: BaseException) -> None:
+        HTTP_RETRIES.labels(options.name).inc()
+        logger.debug("%s: retry %d after %r", options.name, attempt_no, error, extra={"upstream": options.name})
+
+    async def hedged_attempt() -> Any:
+        # Hedge single attempts, not the retry loop: an upstream that fails fast gets no extra requests
+        hedge_after = options.hedge_delay()
+        if hedge_after is None:
+            return await attempt()
+        return await hedged(attempt, hedge_after, on_hedge=HTTP_HEDGED.labels(options.name).inc)
+
+    return await retry(hedged_attempt, options.retry, should_retry=is_transient, on_retry=on_retry)
+
+
+@asynccontextmanager
+async def use_session(session: aiohttp.ClientSession | None) -> AsyncIterator[aiohttp.ClientSession]:
+    """Yield the shared session if given, otherwise a short-lived one (standalone calls)."""
+    if session is not None and not session.closed:
+        yield session
+        return
+    async with aiohttp.ClientSession() as own_session:
+        yield own_session
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+from telegram.ext import Application
+
+from .config import Settings
+from .db import ReadPool, StationWriter
+from .logs import request_id
+from .providers.openchargemap import SOURCE as OCM_SOURCE, fetch_country_page, normalize_record
+
+
+logger = logging.getLogger(__name__)
+
+OCM_COUNTRY_CODE = "BY"
+OCM_SYNC_STATE_KEY = "ocm_last_sync_utc"
+# Retry a failed sync sooner than the regular interval
+OCM_SYNC_RETRY_S = 300.0
+
+
+async def sync_openchargemap(
+    settings: Settings,
+    session: aiohttp.ClientSession | None,
+    writer: StationWriter,
+    readers: ReadPool,
+) -> int:
+    """
+    Page through the country's OpenChargeMap dataset and bulk-load it into the
+    stations table. The first run loads everything; later runs only ask for
+    records modified since the previous successful sync.
+    Returns the number of stations written.
+    """
+    started = datetime.now(timezone.utc)
+    modified_since = await readers.get_sync_state(OCM_SYNC_STATE_KEY)
+
+    last_id = 0
+    written = 0
+    while True:
+        page = await fetch_country_page(
+            country_code=OCM_COUNTRY_CODE,
+            greater_than_id=last_id,
+            page_size=settings.ocm_sync_page_size,
+            modified_since=modified_since,
+            api_key=settings.openchargemap_api_key,
+            session=session,
+        )
+        if not page:
+            break
+
+        rows = []
+        for item in page:
+            try:
+                rows.append(normalize_record(item).as_row())
+            except (TypeError, ValueError):
+                # Records without coordinates can't be served anyway
+                continue
+        written += await writer.upsert_stations(rows)
+
+        page_last_id = max(int(item["ID"]) for item in page)
+        if len(page) < settings.ocm_sync_page_size or page_last_id <= last_id:
+            break
+        last_id = page_last_id
+
+    # Everything not reported as modified is still current as of this sync
+    await writer.mark_source_fresh(OCM_SOURCE, started.timestamp())
+    await writer.set_sync_state(OCM_SYNC_STATE_KEY, started.strftime("%Y-%m-%dT%H:%M:%SZ"))
+    return written
+
+
+async def run_ocm_sync(app: Application) -> None:
+    """Background job: keep the local OpenChargeMap copy in sync on a fixed interval."""
+    settings: Settings = app.bot_data["settings"]
+    request_id.set("ocm-sync")
+    while True:
+        delay = settings.ocm_sync_interval_s
+        try:
+            t0 = time.perf_counter()
+            written = await sync_openchargemap(
+                settings,
+                app.bot_data.get("http_session"),
+                app.bot_data["db_writer"],
+                app.bot_data["db_readers"],
+            )
+            app.bot_data.setdefault("synced_sources", set()).add(OCM_SOURCE)
+            logger.info("OpenChargeMap sync: %d stations written in %.1fs", written, time.perf_counter() - t0)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("OpenChargeMap sync failed: %s", e)
+            delay = min(delay, OCM_SYNC_RETRY_S)
+        await asyncio.sleep(delay)
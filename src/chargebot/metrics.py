@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+# Latency buckets in seconds, from sub-millisecond cache hits to provider deadlines
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Registry:
+    """Metrics rendered together in the Prometheus text exposition format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), registry: Optional[Registry] = REGISTRY) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # Updated from the event loop, the SQLite writer thread and read by the HTTP server thread
+        self._lock = threading.Lock()
+        self._fn: Optional[Callable[[], float]] = None
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values: str) -> "_Child":
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        return _Child(self, tuple(str(v) for v in values))
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """Read the (unlabelled) value from fn at render time instead of tracking it."""
+        self._fn = fn
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class _Child:
+    """A metric bound to one set of label values."""
+
+    __slots__ = ("_metric", "_key")
+
+    def __init__(self, metric: _Metric, key: tuple[str, ...]) -> None:
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._metric._inc(self._key, amount)
+
+    def set(self, value: float) -> None:
+        self._metric._set(self._key, value)
+
+    def observe(self, value: float) -> None:
+        self._metric._observe(self._key, value)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+
+class _ScalarMetric(_Metric):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def _inc(self, key: tuple[str, ...], amount: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _set(self, key: tuple[str, ...], value: float) -> None:
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> list[str]:
+        if self._fn is not None:
+            try:
+                return [f"{self.name} {_format_value(self._fn())}"]
+            except Exception:
+                return []
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Counter(_ScalarMetric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._inc((), amount)
+
+
+class Gauge(_ScalarMetric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._inc((), amount)
+
+    def set(self, value: float) -> None:
+        self._set((), value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last one is +Inf), sum]
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def _observe(self, key: tuple[str, ...], value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][idx] += 1
+            series[1][0] += value
+
+    def observe(self, value: float) -> None:
+        self._observe((), value)
+
+    def time(self):
+        return _Child(self, ()).time()
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# Searches (location, Minsk button, city name); path is where the answer came from
+SEARCH_REQUESTS = Counter(
+    "chargebot_search_requests_total", "Station searches by answer path.", ("path",)
+)
+SEARCH_LATENCY = Histogram(
+    "chargebot_search_duration_seconds", "End-to-end station search latency, including Telegram replies.", ("path",)
+)
+
+PROVIDER_LATENCY = Histogram(
+    "chargebot_provider_duration_seconds", "Provider search latency (successful calls).", ("provider",)
+)
+PROVIDER_ERRORS = Counter("chargebot_provider_errors_total", "Provider searches that raised.", ("provider",))
+PROVIDER_TIMEOUTS = Counter(
+    "chargebot_provider_timeouts_total", "Provider searches that missed their deadline.", ("provider",)
+)
+PROVIDER_SKIPPED = Counter(
+    "chargebot_provider_skipped_total", "Provider requests skipped because the circuit breaker was open.", ("provider",)
+)
+PROVIDER_BREAKER_STATE = Gauge(
+    "chargebot_provider_breaker_state", "Provider circuit breaker state (0 closed, 1 half-open, 2 open).", ("provider",)
+)
+
+HTTP_RETRIES = Counter("chargebot_http_retries_total", "Upstream GETs retried after a transient error.", ("upstream",))
+HTTP_HEDGED = Counter(
+    "chargebot_http_hedged_total", "Upstream GETs that got a hedged second request after a slow first one.", ("upstream",)
+)
+
+CACHE_HITS = Counter("chargebot_cache_hits_total", "Provider response cache hits.")
+CACHE_MISSES = Counter("chargebot_cache_misses_total", "Provider response cache misses.")
+CACHE_HIT_RATIO = Gauge("chargebot_cache_hit_ratio", "Provider response cache hit ratio since start.")
+CACHE_BYTES = Gauge("chargebot_cache_bytes", "Approximate size of the provider response cache.")
+
+DB_WRITE_LATENCY = Histogram(
+    "chargebot_db_write_duration_seconds", "SQLite writer transaction latency (one batch of queued writes)."
+)
+DB_WRITE_QUEUE = Gauge("chargebot_db_write_queue", "Writes waiting for the SQLite writer thread.")
+
+TELEGRAM_LATENCY = Histogram(
+    "chargebot_telegram_request_duration_seconds", "Bot API request latency, excluding rate-limiter waits.", ("endpoint",)
+)
+TELEGRAM_RETRY_AFTER = Counter(
+    "chargebot_telegram_retry_after_total", "Bot API requests rejected with 429 (RetryAfter).", ("endpoint",)
+)
+TELEGRAM_QUEUE_DEPTH = Gauge("chargebot_telegram_queue_depth", "Requests waiting in the outbound rate limiter.")
+
+LOOP_LAG = Histogram(
+    "chargebot_event_loop_lag_seconds",
+    "How late the event loop runs a scheduled wake-up.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+
+async def monitor_loop_lag(interval_s: float = 0.5) -> None:
+    """Background task: sample event-loop lag as the overshoot of a fixed sleep."""
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval_s)
+        LOOP_LAG.observe(max(0.0, loop.time() - t0 - interval_s))
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import copy
+import sys
+from typing import Any, Optional
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    # Operators, statuses and sources repeat across thousands of stations
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Station:
+    """
+    Normalized charging station.
+
+    Slotted to keep cached station sets small. The provider payload is only
+    kept when a normalizer is asked for it (keep_raw=True) and is exposed
+    through the read-only `raw` property.
+    """
+
+    __slots__ = (
+        "ext_id",
+        "name",
+        "address",
+        "operator",
+        "latitude",
+        "longitude",
+        "power_kw",
+        "status",
+        "last_seen_utc",
+        "source",
+        "fetched_at",
+        "distance_km",
+        "_raw",
+    )
+
+    def __init__(
+        self,
+        ext_id: str,
+        name: Optional[str],
+        address: Optional[str],
+        operator: Optional[str],
+        latitude: float,
+        longitude: float,
+        power_kw: Optional[float] = None,
+        status: Optional[str] = None,
+        last_seen_utc: Optional[str] = None,
+        source: Optional[str] = None,
+        *,
+        fetched_at: Optional[float] = None,
+        distance_km: Optional[float] = None,
+        raw: Optional[dict[str, Any]] = None,
+    ) -> None:
+        self.ext_id = ext_id
+        self.name = name
+        self.address = address
+        self.operator = _intern(operator)
+        self.latitude = latitude
+        self.longitude = longitude
+        self.power_kw = power_kw
+        self.status = _intern(status)
+        self.last_seen_utc = last_seen_utc
+        self.source = _intern(source)
+        self.fetched_at = fetched_at
+        self.distance_km = distance_km
+        self._raw = raw
+
+    @property
+    def raw(self) -> Optional[dict[str, Any]]:
+        """Original provider payload, if the normalizer kept it."""
+        return self._raw
+
+    @property
+    def coords(self) -> tuple[float, float]:
+        return self.latitude, self.longitude
+
+    def as_row(self) -> tuple:
+        """Row tuple for db.upsert_stations."""
+        return (
+            self.ext_id,
+            self.name,
+            self.address,
+            self.operator,
+            self.latitude,
+            self.longitude,
+            self.power_kw,
+            self.status,
+            self.last_seen_utc,
+            self.source,
+        )
+
+    def with_distance(self, distance_km: float) -> "Station":
+        """Copy of the station at distance_km from a search point; this one is left untouched."""
+        station = copy.copy(self)
+        station.distance_km = distance_km
+        return station
+
+    @classmethod
+    def from_row(cls, row: tuple, *, distance_km: Optional[float] = None) -> "Station":
+        """Build from a db.STATION_COLUMNS row (as_row() order plus fetched_at)."""
+        return cls(*row[:10], fetched_at=row[10], distance_km=distance_km)
+
+    def __repr__(self) -> str:
+        return f"Station({self.ext_id!r}, {self.name!r}, {self.latitude:.5f}, {self.longitude:.5f}, source={self.source!r})"
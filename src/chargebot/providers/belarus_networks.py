@@ -1,15 +1,20 @@
 from __future__ import annotations
 
 import aiohttp
-from typing import Any
+import uuid
+from typing import Any, Iterable
 from bs4 import BeautifulSoup
 import re
 
+from ..models import Station
+from ..utils.geo import GridIndex
+
+SOURCE = "belarus_networks"
+
 
 # Static data for Belarusian charging networks
 # In production, this would be scraped from their websites
 BELARUSIAN_STATIONS = [
-    # User-added stations will be added here
     # Malanka stations (sample data)
     {
         "id": "malanka_minsk_1",
@@ -130,6 +135,11 @@ BELARUSIAN_STATIONS = [
     }
 ]
 
+# Spatial index over the static stations plus user submissions loaded at startup
+_INDEX = GridIndex()
+for _station in BELARUSIAN_STATIONS:
+    _INDEX.insert(_station["latitude"], _station["longitude"], _station)
+
 
 async def fetch_nearby(
     *,
@@ -138,74 +148,83 @@ async def fetch_nearby(
     radius_km: float,
     max_results: int,
     api_key: str | None,
+    session: aiohttp.ClientSession | None = None,
 ) -> list[dict[str, Any]]:
     """
     Return Belarusian charging stations within radius.
     Uses static data - in production would scrape from websites.
     """
-    import math
-
-    def haversine_distance(lat1, lon1, lat2, lon2):
-        """Calculate distance between two points in km"""
-        R = 6371  # Earth radius in km
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = math.sin(dlat/2) * math.sin(dlat/2) + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2) * math.sin(dlon/2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        return R * c
-
-    # Filter stations within radius
     nearby_stations = []
-    for station in BELARUSIAN_STATIONS:
-        distance = haversine_distance(lat, lon, station["latitude"], station["longitude"])
-        if distance <= radius_km:
-            station_with_distance = station.copy()
-            station_with_distance["distance_km"] = distance
-            nearby_stations.append(station_with_distance)
+    for distance, station in _INDEX.nearest(lat, lon, radius_km, max_results):
+        station_with_distance = station.copy()
+        station_with_distance["distance_km"] = distance
+        nearby_stations.append(station_with_distance)
+    return nearby_stations
 
-    # Sort by distance and limit results
-    nearby_stations.sort(key=lambda x: x["distance_km"])
-    return nearby_stations[:max_results]
 
-
-def add_user_station(name: str, address: str, operator: str, lat: float, lon: float, power_kw: int = None) -> bool:
-    """
-    Add a new station submitted by user.
-    Returns True if added successfully.
-    """
-    try:
-        new_station = {
-            "id": f"user_{len(BELARUSIAN_STATIONS) + 1}_{int(lat * 1000)}_{int(lon * 1000)}",
-            "name": name,
-            "address": address,
-            "latitude": lat,
-            "longitude": lon,
-            "power_kw": power_kw or 22,  # Default 22kW if not specified
-            "operator": operator or "Частная",
-            "network": "user",
-        }
-        BELARUSIAN_STATIONS.append(new_station)
-        return True
-    except Exception as e:
-        print(f"Error adding user station: {e}")
-        return False
-
-
-def normalize_record(item: dict[str, Any]) -> dict[str, Any]:
+def new_user_station(name: str, address: str, operator: str, lat: float, lon: float, power_kw: int = None) -> dict[str, Any]:
+    """Build the record for a station submitted by a user."""
     return {
-        "ext_id": item.get("id", f"by_{item.get('network', 'unknown')}"),
-        "name": item.get("name", "Зарядная станция"),
-        "address": item.get("address", ""),
-        "operator": item.get("operator", "Белорусская сеть"),
-        "latitude": float(item.get("latitude", 0)),
-        "longitude": float(item.get("longitude", 0)),
-        "power_kw": item.get("power_kw"),
-        "status": "available",
-        "last_seen_utc": None,
-        "raw": item,
+        "id": f"user_{uuid.uuid4().hex[:12]}",
+        "name": name,
+        "address": address,
+        "latitude": lat,
+        "longitude": lon,
+        "power_kw": power_kw or 22,  # Default 22kW if not specified
+        "operator": operator or "Частная",
+        "network": "user",
     }
 
 
+# User stations in the index by id, so moderation can take them out again
+_USER_STATIONS: dict[str, dict[str, Any]] = {}
+
+
+def add_user_station(station: dict[str, Any]) -> None:
+    """Make a user station searchable; the index is updated in place."""
+    _INDEX.insert(station["latitude"], station["longitude"], station)
+    _USER_STATIONS[station["id"]] = station
+
+
+def user_station_ids() -> set[str]:
+    return set(_USER_STATIONS)
+
+
+def remove_user_stations(ids: Iterable[str]) -> int:
+    """Stop serving the given user stations (e.g. rejected by moderation). Returns how many were removed."""
+    removed = 0
+    for station_id in ids:
+        station = _USER_STATIONS.pop(station_id, None)
+        if station is not None and _INDEX.remove(station["latitude"], station["longitude"], station):
+            removed += 1
+    return removed
+
+
+def load_user_stations(stations: Iterable[dict[str, Any]]) -> int:
+    """Add persisted user stations to the index at startup. Returns how many were loaded."""
+    count = 0
+    for station in stations:
+        add_user_station(station)
+        count += 1
+    return count
+
+
+def normalize_record(item: dict[str, Any], *, keep_raw: bool = False) -> Station:
+    return Station(
+        ext_id=item.get("id", f"by_{item.get('network', 'unknown')}"),
+        name=item.get("name", "Зарядная станция"),
+        address=item.get("address", ""),
+        operator=item.get("operator", "Белорусская сеть"),
+        latitude=float(item.get("latitude", 0)),
+        longitude=float(item.get("longitude", 0)),
+        power_kw=item.get("power_kw"),
+        status="available",
+        last_seen_utc=None,
+        source=SOURCE,
+        raw=item if keep_raw else None,
+    )
+
+
 # Individual network providers for future extension
 async def fetch_malanka_stations():
     """Fetch stations from Malanka network"""
@@ -217,4 +236,4 @@ async def fetch_a100_stations():
 
 async def fetch_belorusneft_stations():
     """Fetch stations from Belorusneft network"""
-    return [s for s in BELARUSIAN_STATIONS if s["network"] == "belorusneft"]
\ No newline at end of file
+    return [s for s in BELARUSIAN_STATIONS if s["network"] == "belorusneft"]
@@ -3,7 +3,23 @@ from __future__ import annotations
 import aiohttp
 from typing import Any
 
+from ..http_session import RequestOptions, get_json, use_session
+from ..models import Station
+from ..utils.retry import RetryPolicy
+
 OCM_BASE = "https://api.openchargemap.io/v3/poi/"
+SOURCE = "openchargemap"
+# Most POIs one nearby search returns
+MAX_RESULTS = 100
+
+# Standalone calls; the registry passes options built from settings
+DEFAULT_OPTIONS = RequestOptions(name=SOURCE, read_timeout_s=6.0, hedge_quantile=0.95)
+# Bulk pages are large and nobody waits on them: long reads, patient retries, no hedging
+SYNC_OPTIONS = RequestOptions(
+    name=f"{SOURCE}_sync",
+    read_timeout_s=60.0,
+    retry=RetryPolicy(retries=3, base_delay_s=1.0, max_delay_s=30.0),
+)
 
 
 async def fetch_nearby(
@@ -13,6 +29,8 @@ async def fetch_nearby(
     radius_km: float,
     max_results: int,
     api_key: str | None,
+    session: aiohttp.ClientSession | None = None,
+    options: RequestOptions | None = None,
 ) -> list[dict[str, Any]]:
     params = {
         "output": "json",
@@ -21,24 +39,59 @@ async def fetch_nearby(
         "distance": str(radius_km),
         "distanceunit": "KM",
         "countrycode": "BY",
-        "maxresults": str(max(1, min(max_results, 100))),
+        "maxresults": str(max(1, min(max_results, MAX_RESULTS))),
         "compact": "true",
         "verbose": "false",
     }
     headers = {}
     if api_key and api_key.strip():
         headers["X-API-Key"] = api_key
-    async with aiohttp.ClientSession(headers=headers) as session:
+    async with use_session(session) as http:
         # Convert params to ensure all values are strings
         str_params = {k: str(v) for k, v in params.items()}
 
-        async with session.get(OCM_BASE, params=str_params, timeout=aiohttp.ClientTimeout(total=20)) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
-            return list(data)
+        data = await get_json(http, OCM_BASE, params=str_params, headers=headers, options=options or DEFAULT_OPTIONS)
+        return list(data)
+
+
+async def fetch_country_page(
+    *,
+    country_code: str,
+    greater_than_id: int,
+    page_size: int,
+    modified_since: str | None,
+    api_key: str | None,
+    session: aiohttp.ClientSession | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Fetch one page of a country's POIs ordered by ID, starting after greater_than_id.
+    modified_since (ISO 8601, UTC) limits the page to records changed since then.
+    """
+    params = {
+        "output": "json",
+        "countrycode": country_code,
+        "maxresults": str(page_size),
+        "sortby": "id_asc",
+        "greaterthanid": str(greater_than_id),
+        "compact": "true",
+        "verbose": "false",
+    }
+    if modified_since:
+        params["modifiedsince"] = modified_since
+    headers = {}
+    if api_key and api_key.strip():
+        headers["X-API-Key"] = api_key
+    async with use_session(session) as http:
+        data = await get_json(http, OCM_BASE, params=params, headers=headers, options=SYNC_OPTIONS)
+        return list(data)
+
 
+def record_coords(item: dict[str, Any]) -> tuple[float, float]:
+    addr_info = item["AddressInfo"]
+    return float(addr_info["Latitude"]), float(addr_info["Longitude"])
 
-def normalize_record(item: dict[str, Any]) -> dict[str, Any]:
+
+def normalize_record(item: dict[str, Any], *, keep_raw: bool = False) -> Station:
     addr_info = item.get("AddressInfo", {})
     operator_info = item.get("OperatorInfo", {})
     status_info = item.get("StatusType", {})
@@ -48,17 +101,18 @@ def normalize_record(item: dict[str, Any]) -> dict[str, Any]:
         max_power = max((c.get("PowerKW") or 0) for c in connections) if connections else None
     except Exception:
         max_power = None
-    return {
-        "ext_id": str(item.get("ID")),
-        "name": addr_info.get("Title"),
-        "address": addr_info.get("AddressLine1"),
-        "operator": operator_info.get("Title"),
-        "latitude": float(addr_info.get("Latitude")),
-        "longitude": float(addr_info.get("Longitude")),
-        "power_kw": max_power,
-        "status": status_info.get("Title"),
-        "last_seen_utc": item.get("DateLastStatusUpdate"),
-        "raw": item,
-    }
+    return Station(
+        ext_id=str(item.get("ID")),
+        name=addr_info.get("Title"),
+        address=addr_info.get("AddressLine1"),
+        operator=operator_info.get("Title"),
+        latitude=float(addr_info.get("Latitude")),
+        longitude=float(addr_info.get("Longitude")),
+        power_kw=max_power,
+        status=status_info.get("Title"),
+        last_seen_utc=item.get("DateLastStatusUpdate"),
+        source=SOURCE,
+        raw=item if keep_raw else None,
+    )
 
 
@@ -3,7 +3,13 @@ from __future__ import annotations
 import aiohttp
 from typing import Any
 
+from ..http_session import use_session
+from ..models import Station
+
 PLUGSHARE_BASE = "https://api.plugshare.com/v3/locations/region"
+SOURCE = "plugshare"
+# PlugShare limit per request
+MAX_RESULTS = 50
 
 
 async def fetch_nearby(
@@ -13,6 +19,7 @@ async def fetch_nearby(
     radius_km: float,
     max_results: int,
     api_key: str | None,
+    session: aiohttp.ClientSession | None = None,
 ) -> list[dict[str, Any]]:
     # PlugShare uses miles, convert km to miles
     radius_miles = radius_km * 0.621371
@@ -21,7 +28,7 @@ async def fetch_nearby(
         "latitude": lat,
         "longitude": lon,
         "distance": radius_miles,
-        "count": min(max_results, 50),  # PlugShare limit
+        "count": min(max_results, MAX_RESULTS),
         "minimal": "false",
         "access": "public",
     }
@@ -30,17 +37,20 @@ async def fetch_nearby(
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
 
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async with session.get(PLUGSHARE_BASE, params=params, timeout=aiohttp.ClientTimeout(total=20)) as resp:
-            if resp.status == 403:
-                # PlugShare blocks requests without proper API key or from certain regions
-                return []
+    async with use_session(session) as http:
+        async with http.get(PLUGSHARE_BASE, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=20)) as resp:
+            # PlugShare answers 403 without a proper API key or from certain regions; raising lets
+            # the provider's circuit breaker stop calling it instead of paying for a request every search
             resp.raise_for_status()
             data = await resp.json()
             return list(data) if isinstance(data, list) else []
 
 
-def normalize_record(item: dict[str, Any]) -> dict[str, Any]:
+def record_coords(item: dict[str, Any]) -> tuple[float, float]:
+    return float(item["latitude"]), float(item["longitude"])
+
+
+def normalize_record(item: dict[str, Any], *, keep_raw: bool = False) -> Station:
     addr_info = item.get("address", {})
     operator_info = item.get("operator", {})
     connections = item.get("stations", [{}])[0].get("outlets", []) if item.get("stations") else []
@@ -54,15 +64,16 @@ def normalize_record(item: dict[str, Any]) -> dict[str, Any]:
                 powers.append(outlet["power"])
         max_power = max(powers) if powers else None
 
-    return {
-        "ext_id": f"ps_{item.get('id')}",
-        "name": item.get("name"),
-        "address": f"{addr_info.get('street', '')}, {addr_info.get('city', '')}".strip(", "),
-        "operator": operator_info.get("name") if operator_info else None,
-        "latitude": float(item.get("latitude", 0)),
-        "longitude": float(item.get("longitude", 0)),
-        "power_kw": max_power,
-        "status": "available" if item.get("available", False) else "unknown",
-        "last_seen_utc": item.get("updated_at"),
-        "raw": item,
-    }
\ No newline at end of file
+    return Station(
+        ext_id=f"ps_{item.get('id')}",
+        name=item.get("name"),
+        address=f"{addr_info.get('street', '')}, {addr_info.get('city', '')}".strip(", "),
+        operator=operator_info.get("name") if operator_info else None,
+        latitude=float(item.get("latitude", 0)),
+        longitude=float(item.get("longitude", 0)),
+        power_kw=max_power,
+        status="available" if item.get("available", False) else "unknown",
+        last_seen_utc=item.get("updated_at"),
+        source=SOURCE,
+        raw=item if keep_raw else None,
+    )
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import aiohttp
+
+from ..cache import GeoCellCache
+from ..config import Settings
+from ..http_session import RequestOptions
+from ..metrics import (
+    PROVIDER_BREAKER_STATE,
+    PROVIDER_ERRORS,
+    PROVIDER_LATENCY,
+    PROVIDER_SKIPPED,
+    PROVIDER_TIMEOUTS,
+)
+from ..models import Station
+from ..utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from ..utils.retry import RetryPolicy
+from . import belarus_networks, malanka, openchargemap, plugshare
+
+
+logger = logging.getLogger(__name__)
+
+FetchNearby = Callable[..., Awaitable[list[dict[str, Any]]]]
+
+# Capabilities a provider can declare
+NETWORK = "network"  # talks to a remote service per request
+GEO_CACHE = "geo_cache"  # responses can be served from GeoCellCache (needs coords)
+BULK_SYNC = "bulk_sync"  # mirrored locally by a background job, no per-request fetch once synced
+
+# Successful answers slower than this share of the provider deadline count as slow calls
+SLOW_CALL_FRACTION = 0.8
+
+# chargebot_provider_breaker_state values
+BREAKER_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+@dataclass
+class Provider:
+    """
+    A station source behind a uniform async interface.
+
+    fetch has the fetch_nearby signature of the provider modules; normalize
+    turns one raw item into a Station. Lower priority values come first in
+    the merged result, so their records win deduplication. max_results is
+    the provider's own cap on results per request, if any. Network providers
+    get a circuit breaker from build_providers. It guards the upstream
+    request only: cached answers are served while it is open, and don't
+    count as calls.
+    """
+
+    name: str
+    fetch: FetchNearby
+    normalize: Callable[[dict[str, Any]], Station]
+    timeout_s: float
+    priority: int
+    capabilities: frozenset[str] = field(default_factory=frozenset)
+    coords: Optional[Callable[[dict[str, Any]], tuple[float, float]]] = None
+    api_key: Optional[str] = None
+    max_results: Optional[int] = None
+    breaker: Optional[CircuitBreaker] = None
+
+    async def search(
+        self,
+        *,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        max_results: int,
+        session: aiohttp.ClientSession | None,
+        cache: GeoCellCache | None,
+    ) -> list[Station]:
+        """
+        Fetch and normalize; records that fail to normalize are skipped.
+        Upstream requests share a deadline of timeout_s; raises
+        asyncio.TimeoutError past it and CircuitOpenError if the breaker
+        refuses a request the cache can't answer.
+        """
+        params = dict(
+            lat=lat,
+            lon=lon,
+            radius_km=radius_km,
+            max_results=max_results,
+            api_key=self.api_key,
+            session=session,
+        )
+        deadline = time.monotonic() + self.timeout_s
+
+        async def fetch(**kwargs: Any) -> list[dict[str, Any]]:
+            return await self._fetch_upstream(deadline, **kwargs)
+
+        if cache is not None and GEO_CACHE in self.capabilities and self.coords is not None:
+            items = await cache.fetch(self.name, fetch, self.coords, limit=self.max_results, **params)
+        else:
+            items = await fetch(**params)
+
+        stations = []
+        for item in items:
+            try:
+                stations.append(self.normalize(item))
+            except Exception as e:
+                logger.warning("%s: normalization error: %s", self.name, e)
+        return stations
+
+    async def _fetch_upstream(self, deadline: float, **params: Any) -> list[dict[str, Any]]:
+        """One request to the provider, under the search deadline and the circuit breaker."""
+        breaker = self.breaker
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(self.name)
+        t0 = time.perf_counter()
+        try:
+            items = await asyncio.wait_for(self.fetch(**params), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.release()
+            raise
+        except Exception:
+            # Timeouts included
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        if breaker is not None:
+            breaker.record_success(time.perf_counter() - t0)
+        return items
+
+
+_FACTORIES: dict[str, Callable[[Settings], Provider]] = {}
+
+
+def register_provider(name: str, factory: Callable[[Settings], Provider]) -> None:
+    """Make a provider available to build_providers; enable it via the PROVIDERS setting."""
+    _FACTORIES[name] = factory
+
+
+def available_providers() -> list[str]:
+    return list(_FACTORIES)
+
+
+def build_providers(settings: Settings) -> list[Provider]:
+    """Instantiate the providers enabled in settings, ordered by priority."""
+    providers = []
+    for name in settings.enabled_providers:
+        factory = _FACTORIES.get(name)
+        if factory is None:
+            logger.warning("Unknown provider '%s' in PROVIDERS, ignored (available: %s)", name, ", ".join(_FACTORIES))
+            continue
+        provider = factory(settings)
+        if NETWORK in provider.capabilities:
+            provider.breaker = _make_breaker(provider, settings)
+        providers.append(provider)
+    providers.sort(key=lambda p: p.priority)
+    return providers
+
+
+def _make_breaker(provider: Provider, settings: Settings) -> CircuitBreaker:
+    def on_change(state: str) -> None:
+        PROVIDER_BREAKER_STATE.labels(provider.name).set(BREAKER_STATE_VALUES[state])
+        logger.warning("%s: circuit breaker %s", provider.name, state, extra={"provider": provider.name, "breaker": state})
+
+    PROVIDER_BREAKER_STATE.labels(provider.name).set(BREAKER_STATE_VALUES[CLOSED])
+    return CircuitBreaker(
+        window=settings.breaker_window,
+        failure_rate=settings.breaker_failure_rate,
+        # Answers that arrive just inside the deadline count as slow
+        slow_call_s=provider.timeout_s * SLOW_CALL_FRACTION,
+        cooldown_s=settings.breaker_cooldown_s,
+        max_cooldown_s=settings.breaker_max_cooldown_s,
+        on_change=on_change,
+    )
+
+
+def breaker_states(providers: list[Provider]) -> dict[str, dict[str, Any]]:
+    """Circuit breaker snapshot per network provider, for the health endpoint."""
+    return {p.name: p.breaker.snapshot() for p in providers if p.breaker is not None}
+
+
+async def _search_with_deadline(provider: Provider, **params: Any) -> list[Station] | None:
+    """Run one provider search; None if it fails, misses its deadline or its breaker is open."""
+    t0 = time.perf_counter()
+    try:
+        stations = await provider.search(**params)
+    except CircuitOpenError:
+        PROVIDER_SKIPPED.labels(provider.name).inc()
+        logger.debug("%s: skipped, circuit breaker open", provider.name, extra={"provider": provider.name})
+        return None
+    except asyncio.TimeoutError:
+        PROVIDER_TIMEOUTS.labels(provider.name).inc()
+        logger.warning("%s: no answer within %.1fs, skipped", provider.name, provider.timeout_s, extra={"provider": provider.name})
+        return None
+    except Exception as e:
+        PROVIDER_ERRORS.labels(provider.name).inc()
+        logger.warning("%s error: %s", provider.name, e, extra={"provider": provider.name})
+        return None
+    elapsed = time.perf_counter() - t0
+    PROVIDER_LATENCY.labels(provider.name).observe(elapsed)
+    logger.debug(
+        "%s: %d stations",
+        provider.name,
+        len(stations),
+        extra={"provider": provider.name, "stations": len(stations), "duration_ms": round(elapsed * 1000, 1)},
+    )
+    return stations
+
+
+async def search_each(
+    providers: Iterable[Provider],
+    *,
+    lat: float,
+    lon: float,
+    radius_km: float,
+    max_results: int,
+    session: aiohttp.ClientSession | None = None,
+    cache: GeoCellCache | None = None,
+) -> list[tuple[Provider, list[Station] | None]]:
+    """
+    Query providers concurrently, each under its own deadline; one
+    (provider, stations) pair per provider in the given order, with None for
+    a provider that failed, missed its deadline or was skipped. A provider
+    whose breaker is open still answers from the cache, and is skipped when
+    that would need a request.
+    """
+    providers = list(providers)
+    results = await asyncio.gather(*(
+        _search_with_deadline(
+            provider,
+            lat=lat,
+            lon=lon,
+            radius_km=radius_km,
+            max_results=max_results,
+            session=session,
+            cache=cache,
+        )
+        for provider in providers
+    ))
+    return list(zip(providers, results))
+
+
+async def search_all(providers: Iterable[Provider], **params: Any) -> list[Station]:
+    """search_each with the answers concatenated in priority order; failed providers contribute nothing."""
+    return [station for _, stations in await search_each(providers, **params) for station in stations or ()]
+
+
+def _ocm_request_options(settings: Settings) -> RequestOptions:
+    return RequestOptions(
+        name=openchargemap.SOURCE,
+        connect_timeout_s=settings.ocm_connect_timeout_s,
+        read_timeout_s=settings.ocm_read_timeout_s,
+        retry=RetryPolicy(retries=settings.ocm_retries, base_delay_s=settings.ocm_retry_backoff_s),
+        hedge_quantile=settings.ocm_hedge_quantile or None,
+    )
+
+
+register_provider(openchargemap.SOURCE, lambda s: Provider(
+    name=openchargemap.SOURCE,
+    fetch=functools.partial(openchargemap.fetch_nearby, options=_ocm_request_options(s)),
+    normalize=openchargemap.normalize_record,
+    timeout_s=s.ocm_timeout_s,
+    priority=10,
+    capabilities=frozenset({NETWORK, GEO_CACHE, BULK_SYNC}),
+    coords=openchargemap.record_coords,
+    api_key=s.openchargemap_api_key,
+    max_results=openchargemap.MAX_RESULTS,
+))
+register_provider(plugshare.SOURCE, lambda s: Provider(
+    name=plugshare.SOURCE,
+    fetch=plugshare.fetch_nearby,
+    normalize=plugshare.normalize_record,
+    timeout_s=s.plugshare_timeout_s,
+    priority=20,
+    capabilities=frozenset({NETWORK, GEO_CACHE}),
+    coords=plugshare.record_coords,
+    api_key=s.plugshare_api_key,
+    max_results=plugshare.MAX_RESULTS,
+))
+register_provider(belarus_networks.SOURCE, lambda s: Provider(
+    name=belarus_networks.SOURCE,
+    fetch=belarus_networks.fetch_nearby,
+    normalize=belarus_networks.normalize_record,
+    timeout_s=s.belarus_timeout_s,
+    priority=30,
+))
+register_provider(malanka.SOURCE, lambda s: Provider(
+    name=malanka.SOURCE,
+    fetch=malanka.fetch_nearby,
+    normalize=malanka.normalize_record,
+    timeout_s=s.malanka_timeout_s,
+    priority=40,
+    capabilities=frozenset({NETWORK}),
+))
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import itertools
+import time
+from typing import Any, Callable, Coroutine, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from .metrics import TELEGRAM_LATENCY, TELEGRAM_RETRY_AFTER
+
+
+logger = logging.getLogger(__name__)
+
+# Priorities passed as rate_limit_args; lower values are sent first
+PRIORITY_INTERACTIVE = 0  # replies and edits answering a user action
+PRIORITY_BROADCAST = 10  # notifications nobody is waiting for
+
+# Endpoints that answer a pending client request and should never wait behind messages
+_URGENT_ENDPOINTS = frozenset({"answerCallbackQuery", "answerInlineQuery"})
+
+# Idle per-chat buckets are dropped once there are more than this many
+_MAX_IDLE_BUCKETS = 10_000
+
+
+class _TokenBucket:
+    """
+    Token bucket with reservations: reserve() takes a token immediately and
+    returns how long the caller has to wait for it, so concurrent callers
+    queue up in order instead of racing for the same token.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available, without taking it."""
+        self._refill(now)
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+    def reserve(self, now: float) -> float:
+        wait = self.delay(now)
+        self.tokens -= 1.0
+        return wait
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class TelegramRateLimiter(BaseRateLimiter[int]):
+    """
+    Outbound send scheduler for Telegram's flood limits.
+
+    Requests addressed to a chat first wait for that chat's bucket (about one
+    message per second in private chats, 20 per minute in groups), then queue
+    for the global bucket (about 30 per second), which is handed out in
+    priority order: rate_limit_args is the priority, defaulting to
+    PRIORITY_INTERACTIVE. A RetryAfter from Telegram pauses all sending for
+    the requested time and the request is retried up to max_retries times.
+    """
+
+    def __init__(
+        self,
+        *,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        group_rate: float = 20 / 60,
+        chat_burst: float = 3.0,
+        max_retries: int = 3,
+    ) -> None:
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+
+        self._global: Optional[_TokenBucket] = None
+        self._chats: dict[Union[int, str], _TokenBucket] = {}
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+
+        self.sent = 0
+        self.retries = 0
+        self.max_queue_depth = 0
+
+    async def initialize(self) -> None:
+        # ExtBot.initialize runs for the application and again for its updater
+        if self._dispatcher is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._global = _TokenBucket(self.global_rate, self.global_rate, loop.time())
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for _, _, waiter in self._queue:
+            waiter.cancel()
+        self._queue.clear()
+        self._chats.clear()
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a global send slot."""
+        return len(self._queue)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "chats": len(self._chats),
+            "sent": self.sent,
+            "retries": self.retries,
+        }
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, dict[str, Any], list[dict[str, Any]]]]],
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, dict[str, Any], list[dict[str, Any]]]:
+        if endpoint in _URGENT_ENDPOINTS:
+            priority = -1
+        else:
+            priority = PRIORITY_INTERACTIVE if rate_limit_args is None else rate_limit_args
+        chat_id = data.get("chat_id")
+
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                await self._wait_for_chat(chat_id)
+            await self._wait_for_slot(priority)
+            t0 = time.perf_counter()
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                TELEGRAM_RETRY_AFTER.labels(endpoint).inc()
+                attempt += 1
+                self.retries += 1
+                retry_after = float(e.retry_after)
+                loop = asyncio.get_running_loop()
+                self._paused_until = max(self._paused_until, loop.time() + retry_after)
+                logger.warning(
+                    "Telegram flood control on %s: retry in %.0fs (attempt %d)", endpoint, retry_after, attempt
+                )
+                if attempt > self.max_retries:
+                    raise
+                continue
+            TELEGRAM_LATENCY.labels(endpoint).observe(time.perf_counter() - t0)
+            self.sent += 1
+            return result
+
+    async def _wait_for_chat(self, chat_id: Union[int, str]) -> None:
+        now = asyncio.get_running_loop().time()
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= _MAX_IDLE_BUCKETS:
+                self._prune(now)
+            # Negative ids (and @channel usernames) are groups and channels
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            rate = self.group_rate if is_group else self.chat_rate
+            bucket = self._chats[chat_id] = _TokenBucket(rate, self.chat_burst, now)
+        wait = bucket.reserve(now)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _prune(self, now: float) -> None:
+        for chat_id in [c for c, b in self._chats.items() if b.idle(now)]:
+            del self._chats[chat_id]
+
+    async def _wait_for_slot(self, priority: int) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), waiter))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        self._wakeup.set()
+        await waiter
+
+    async def _dispatch(self) -> None:
+        """Hand out global send slots to queued requests, most urgent first."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = loop.time()
+            wait = max(self._paused_until - now, self._global.delay(now))
+            if wait > 0:
+                # Re-check after sleeping: a RetryAfter may have extended the pause
+                await asyncio.sleep(wait)
+                continue
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                # Cancelled while queued
+                continue
+            self._global.reserve(now)
+            waiter.set_result(None)
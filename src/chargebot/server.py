@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from aiohttp import web
+from telegram.ext import Application
+
+from .config import Settings
+from .metrics import render
+from .providers.registry import breaker_states
+from .rate_limit import TelegramRateLimiter
+from .utils.singleflight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
+
+# A readiness probe shouldn't hang on a busy or locked database
+DB_CHECK_TIMEOUT_S = 2.0
+# A successful getMe keeps Telegram marked reachable this long; probes in between reuse it
+TELEGRAM_CHECK_TTL_S = 30.0
+TELEGRAM_CHECK_TIMEOUT_S = 5.0
+
+
+class TelegramCheck:
+    """
+    Bot API reachability for readiness: a getMe call whose success is cached
+    for TELEGRAM_CHECK_TTL_S. The probes themselves refresh it, so an idle
+    bot, or a webhook replica the load balancer has taken out of rotation,
+    recovers without any user traffic. Concurrent probes share one request;
+    failures aren't cached.
+    """
+
+    def __init__(self, application: Application) -> None:
+        self._application = application
+        self._flight = SingleFlight()
+        self._ok_at: float | None = None
+
+    async def __call__(self) -> dict[str, Any]:
+        if not self._application.running:
+            return {"ok": False, "error": "application not running"}
+        if self._ok_at is None or time.monotonic() - self._ok_at > TELEGRAM_CHECK_TTL_S:
+            try:
+                await self._flight.do("getMe", self._get_me)
+            except Exception as e:
+                return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        return {"ok": True, "checked_s_ago": round(time.monotonic() - self._ok_at, 1)}
+
+    async def _get_me(self) -> None:
+        await asyncio.wait_for(self._application.bot.get_me(), timeout=TELEGRAM_CHECK_TIMEOUT_S)
+        self._ok_at = time.monotonic()
+
+
+async def _check_database(application: Application) -> dict[str, Any]:
+    writer = application.bot_data["db_writer"]
+    if not writer.alive:
+        return {"ok": False, "error": "writer thread stopped", "write_queue": writer.pending}
+    try:
+        await asyncio.wait_for(application.bot_data["db_readers"].ping(), timeout=DB_CHECK_TIMEOUT_S)
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}", "write_queue": writer.pending}
+    return {"ok": True, "write_queue": writer.pending}
+
+
+async def readiness(
+    application: Application, settings: Settings, telegram_check: TelegramCheck
+) -> tuple[bool, dict[str, Any]]:
+    """
+    Whether this instance can serve users, with the state behind it.
+    Telegram and the database gate readiness; open provider breakers only
+    mark the instance degraded, since every replica shares the same
+    upstreams and the local store still answers.
+    """
+    telegram, database = await asyncio.gather(telegram_check(), _check_database(application))
+    limiter = application.bot.rate_limiter
+    if isinstance(limiter, TelegramRateLimiter):
+        telegram["queue_depth"] = limiter.queue_depth
+    providers = breaker_states(application.bot_data["providers"])
+    ready = telegram["ok"] and database["ok"]
+    if not ready:
+        status = "unavailable"
+    elif any(p["state"] != "closed" for p in providers.values()):
+        status = "degraded"
+    else:
+        status = "ok"
+    return ready, {
+        "status": status,
+        "mode": settings.bot_mode,
+        "telegram": telegram,
+        "database": database,
+        "providers": providers,
+    }
+
+
+def create_web_app(application: Application, settings: Settings) -> web.Application:
+    """
+    The bot's HTTP server: health checks and /metrics, plus the webhook
+    route in webhook mode (added by webhook.add_webhook_route).
+
+        /              plain OK while the process serves requests
+        /health        full state as JSON, always 200
+        /health/live   liveness: 503 once the SQLite writer thread died
+        /health/ready  readiness: 503 unless Telegram (getMe) and the database answer
+        /metrics       Prometheus text format
+    """
+    started_at = time.monotonic()
+    telegram_check = TelegramCheck(application)
+
+    async def root(request: web.Request) -> web.Response:
+        return web.Response(text="OK")
+
+    async def health(request: web.Request) -> web.Response:
+        _, info = await readiness(application, settings, telegram_check)
+        info["uptime_s"] = round(time.monotonic() - started_at, 1)
+        return web.json_response(info)
+
+    async def live(request: web.Request) -> web.Response:
+        # Answering at all shows the event loop isn't stuck
+        alive = application.bot_data["db_writer"].alive
+        return web.json_response(
+            {"status": "alive" if alive else "dead", "uptime_s": round(time.monotonic() - started_at, 1)},
+            status=200 if alive else 503,
+        )
+
+    async def ready(request: web.Request) -> web.Response:
+        is_ready, info = await readiness(application, settings, telegram_check)
+        return web.json_response(info, status=200 if is_ready else 503)
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(body=render().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    web_app = web.Application()
+    web_app.router.add_get("/", root)
+    web_app.router.add_get("/health", health)
+    web_app.router.add_get("/health/live", live)
+    web_app.router.add_get("/health/ready", ready)
+    web_app.router.add_get("/metrics", metrics)
+    return web_app
+
+
+async def start_server(web_app: web.Application, settings: Settings) -> web.AppRunner:
+    """Serve web_app on the running event loop; stop it with runner.cleanup()."""
+    runner = web.AppRunner(web_app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.http_listen, settings.http_port)
+    await site.start()
+    logger.info("HTTP server listening on %s:%d", settings.http_listen, settings.http_port)
+    return runner
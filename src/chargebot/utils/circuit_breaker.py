@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """A call was refused because the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate / slow-call circuit breaker for one upstream.
+
+    Outcomes of the last `window` calls are kept. Once at least `min_calls`
+    are recorded and the share of failures or of calls slower than
+    `slow_call_s` reaches its threshold, the breaker opens and allow()
+    refuses calls for a cooldown. The cooldown doubles every time the
+    breaker re-opens, up to max_cooldown_s. After it, one probe call is let
+    through (half-open): success closes the breaker and resets the cooldown,
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_s: Optional[float] = None,
+        slow_call_rate: float = 0.8,
+        cooldown_s: float = 30.0,
+        max_cooldown_s: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_change: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_s = slow_call_s
+        self.slow_call_rate = slow_call_rate
+        self.cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self._clock = clock
+        self._on_change = on_change
+        # (failed, slow) per call
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trips = 0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.current_cooldown_s:
+            return HALF_OPEN
+        return self._state
+
+    @property
+    def current_cooldown_s(self) -> float:
+        return min(self.cooldown_s * 2 ** max(0, self._trips - 1), self.max_cooldown_s)
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; in half-open state only one probe at a time."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probe_in_flight:
+            self._set_state(HALF_OPEN)
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self, duration_s: float) -> None:
+        slow = self.slow_call_s is not None and duration_s > self.slow_call_s
+        if self._state == HALF_OPEN:
+            self._probe_in_flight = False
+            if slow:
+                self._trip()
+            else:
+                self._close()
+            return
+        self._record(False, slow)
+
+    def record_failure(self) -> None:
+        if self._state == HALF_OPEN:
+            self._probe_in_flight = False
+            self._trip()
+            return
+        self._record(True, False)
+
+    def release(self) -> None:
+        """The allowed call ended without an outcome (e.g. it was cancelled)."""
+        self._probe_in_flight = False
+
+    def _record(self, failed: bool, slow: bool) -> None:
+        if self._state != CLOSED:
+            # A call that started before the breaker opened
+            return
+        self._outcomes.append((failed, slow))
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return
+        failures = sum(1 for f, _ in self._outcomes if f)
+        slow_calls = sum(1 for _, s in self._outcomes if s)
+        if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+            self._trip()
+
+    def _trip(self) -> None:
+        self._trips += 1
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self._set_state(OPEN)
+
+    def _close(self) -> None:
+        self._trips = 0
+        self._outcomes.clear()
+        self._set_state(CLOSED)
+
+    def _set_state(self, state: str) -> None:
+        changed = state != self._state
+        self._state = state
+        if changed and self._on_change is not None:
+            self._on_change(state)
+
+    def snapshot(self) -> dict[str, Any]:
+        """State for health/status output."""
+        state = self.state
+        calls = len(self._outcomes)
+        info: dict[str, Any] = {
+            "state": state,
+            "calls": calls,
+            "failure_rate": round(sum(1 for f, _ in self._outcomes if f) / calls, 3) if calls else 0.0,
+        }
+        if state != CLOSED:
+            info["cooldown_s"] = self.current_cooldown_s
+            info["retry_in_s"] = round(max(0.0, self._opened_at + self.current_cooldown_s - self._clock()), 1)
+        return info
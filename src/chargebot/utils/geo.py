@@ -1,9 +1,21 @@
+import heapq
 import math
-from typing import Iterable
+from array import array
+from typing import Callable, Iterable, Optional, TypeVar
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python fallback below
+    np = None
+
+T = TypeVar("T")
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = EARTH_RADIUS_KM * math.pi / 180.0
 
 
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    R = 6371.0
+    R = EARTH_RADIUS_KM
     phi1 = math.radians(lat1)
     phi2 = math.radians(lat2)
     d_phi = math.radians(lat2 - lat1)
@@ -14,16 +26,241 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return R * c
 
 
+def bbox_deltas(lat: float, radius_km: float) -> tuple[float, float]:
+    """Half-sizes in degrees (lat, lon) of a box that contains the radius_km circle around lat."""
+    d_lat = radius_km / KM_PER_DEG_LAT
+    # Use the latitude edge nearest the pole, where a degree of longitude is shortest
+    edge_lat = min(abs(lat) + d_lat, 89.0)
+    d_lon = radius_km / (KM_PER_DEG_LAT * math.cos(math.radians(edge_lat)))
+    return d_lat, d_lon
+
+
+class PointColumns:
+    """
+    Coordinates stored as two array('d') columns for batched distance queries.
+
+    nearest() prefilters with an equirectangular bounding box, computes
+    haversine distances only for the survivors and selects the top k without
+    a full sort. NumPy is used when installed; otherwise the same steps run
+    in pure Python.
+    """
+
+    __slots__ = ("lat", "lon", "_np_cache", "_use_numpy")
+
+    def __init__(self, points: Iterable[tuple[float, float]] = (), *, use_numpy: Optional[bool] = None) -> None:
+        self.lat = array("d")
+        self.lon = array("d")
+        self._np_cache = None
+        self._use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+        self.extend(points)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def append(self, lat: float, lon: float) -> int:
+        """Add one point and return its index."""
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self._np_cache = None
+        return len(self.lat) - 1
+
+    def extend(self, points: Iterable[tuple[float, float]]) -> None:
+        for lat, lon in points:
+            self.lat.append(lat)
+            self.lon.append(lon)
+        self._np_cache = None
+
+    def _arrays(self):
+        if self._np_cache is None:
+            self._np_cache = (np.array(self.lat), np.array(self.lon))
+        return self._np_cache
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: Optional[float] = None,
+        k: Optional[int] = None,
+    ) -> list[tuple[float, int]]:
+        """
+        (distance_km, index) pairs for points within radius_km (all points if None),
+        nearest first, at most k of them.
+        """
+        if not len(self) or k == 0:
+            return []
+        if self._use_numpy:
+            return self._nearest_numpy(lat, lon, radius_km, k)
+        return self._nearest_python(lat, lon, radius_km, k)
+
+    def _nearest_numpy(self, lat: float, lon: float, radius_km: Optional[float], k: Optional[int]) -> list[tuple[float, int]]:
+        lats, lons = self._arrays()
+        if radius_km is not None:
+            d_lat, d_lon = bbox_deltas(lat, radius_km)
+            idx = np.flatnonzero((np.abs(lats - lat) <= d_lat) & (np.abs(lons - lon) <= d_lon))
+            c_lat, c_lon = lats[idx], lons[idx]
+        else:
+            idx = None
+            c_lat, c_lon = lats, lons
+
+        phi1 = math.radians(lat)
+        phi2 = np.radians(c_lat)
+        a = np.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(np.radians(c_lon - lon) / 2) ** 2
+        dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        if radius_km is not None:
+            keep = dist <= radius_km
+            idx, dist = idx[keep], dist[keep]
+        else:
+            idx = np.arange(len(dist))
+
+        if k is not None and k < len(dist):
+            part = np.argpartition(dist, k - 1)[:k]
+            idx, dist = idx[part], dist[part]
+        order = np.argsort(dist, kind="stable")
+        return list(zip(dist[order].tolist(), idx[order].tolist()))
+
+    def _nearest_python(self, lat: float, lon: float, radius_km: Optional[float], k: Optional[int]) -> list[tuple[float, int]]:
+        radians, sin, cos, asin, sqrt = math.radians, math.sin, math.cos, math.asin, math.sqrt
+        phi1 = radians(lat)
+        cos_phi1 = cos(phi1)
+        if radius_km is not None:
+            d_lat, d_lon = bbox_deltas(lat, radius_km)
+            lat_lo, lat_hi, lon_lo, lon_hi = lat - d_lat, lat + d_lat, lon - d_lon, lon + d_lon
+        limit = radius_km if radius_km is not None else math.inf
+
+        found: list[tuple[float, int]] = []
+        for i, (p_lat, p_lon) in enumerate(zip(self.lat, self.lon)):
+            if radius_km is not None and not (lat_lo <= p_lat <= lat_hi and lon_lo <= p_lon <= lon_hi):
+                continue
+            phi2 = radians(p_lat)
+            a = sin((phi2 - phi1) / 2) ** 2 + cos_phi1 * cos(phi2) * sin(radians(p_lon - lon) / 2) ** 2
+            d = 2 * EARTH_RADIUS_KM * asin(sqrt(min(a, 1.0)))
+            if d <= limit:
+                found.append((d, i))
+
+        if k is not None and k < len(found):
+            return heapq.nsmallest(k, found)
+        found.sort()
+        return found
+
+
+class GridIndex:
+    """
+    Spatial hash of points with payloads, for data that grows at runtime.
+
+    Points live in fixed lat/lon cells, so insert() is O(1) and never
+    rebuilds anything. nearest() visits only the cells overlapping the
+    query's bounding box and ranks those candidates with PointColumns.
+    """
+
+    def __init__(self, cell_deg: float = 0.25) -> None:
+        self.cell_deg = cell_deg
+        self._cells: dict[tuple[int, int], list[tuple[float, float, object]]] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def insert(self, lat: float, lon: float, payload: object) -> None:
+        self._cells.setdefault(self._cell(lat, lon), []).append((lat, lon, payload))
+        self._size += 1
+
+    def remove(self, lat: float, lon: float, payload: object) -> bool:
+        """Remove a point inserted with this payload object; False if it isn't indexed."""
+        bucket = self._cells.get(self._cell(lat, lon), [])
+        for i, (_, _, p) in enumerate(bucket):
+            if p is payload:
+                del bucket[i]
+                self._size -= 1
+                return True
+        return False
+
+    def nearest(self, lat: float, lon: float, radius_km: float, k: Optional[int] = None) -> list[tuple[float, object]]:
+        """(distance_km, payload) within radius_km, nearest first, at most k."""
+        d_lat, d_lon = bbox_deltas(lat, radius_km)
+        row_lo, col_lo = self._cell(lat - d_lat, lon - d_lon)
+        row_hi, col_hi = self._cell(lat + d_lat, lon + d_lon)
+
+        candidates: list[tuple[float, float, object]] = []
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) < len(self._cells):
+            for row in range(row_lo, row_hi + 1):
+                for col in range(col_lo, col_hi + 1):
+                    candidates.extend(self._cells.get((row, col), ()))
+        else:
+            # Query box covers more cells than exist: scan the occupied ones
+            for (row, col), bucket in self._cells.items():
+                if row_lo <= row <= row_hi and col_lo <= col <= col_hi:
+                    candidates.extend(bucket)
+
+        return [(d, payload) for d, (_, _, payload) in nearest_k(candidates, _lat_lon, lat, lon, radius_km, k)]
+
+
+def _lat_lon(point: tuple) -> tuple[float, float]:
+    return point[0], point[1]
+
+
+def nearest_k(
+    items: Iterable[T],
+    coords: Callable[[T], tuple[float, float]],
+    origin_lat: float,
+    origin_lon: float,
+    radius_km: Optional[float] = None,
+    k: Optional[int] = None,
+) -> list[tuple[float, T]]:
+    """(distance_km, item) for the k items nearest the origin within radius_km, nearest first."""
+    items = list(items)
+    columns = PointColumns(coords(item) for item in items)
+    return [(d, items[i]) for d, i in columns.nearest(origin_lat, origin_lon, radius_km, k)]
+
+
 def sort_by_distance_km(
     items: Iterable[tuple[float, float, object]],
     origin_lat: float,
     origin_lon: float,
 ) -> list[tuple[float, object]]:
-    results: list[tuple[float, object]] = []
-    for lat, lon, payload in items:
-        d = haversine_km(origin_lat, origin_lon, lat, lon)
-        results.append((d, payload))
-    results.sort(key=lambda x: x[0])
-    return results
+    return [(d, payload) for d, (_, _, payload) in nearest_k(items, _lat_lon, origin_lat, origin_lon)]
+
+
+def dedupe_nearby(
+    items: Iterable[T],
+    coords: Callable[[T], tuple[float, float]],
+    threshold_m: float,
+) -> list[T]:
+    """
+    Keep items in order, dropping any item within threshold_m metres of an
+    already kept one. Uses a spatial hash so the cost is linear in len(items).
+    """
+    points = [(coords(item), item) for item in items]
+    if not points:
+        return []
+    threshold_km = threshold_m / 1000.0
 
+    # Longitude cells are sized at the highest latitude present, where a degree
+    # is shortest, so any pair within threshold sits in adjacent cells
+    max_abs_lat = min(max(abs(lat) for (lat, _), _ in points), 89.0)
+    cell_lat = threshold_km / KM_PER_DEG_LAT
+    cell_lon = threshold_km / (KM_PER_DEG_LAT * math.cos(math.radians(max_abs_lat)))
 
+    grid: dict[tuple[int, int], list[tuple[float, float]]] = {}
+    kept: list[T] = []
+    for (lat, lon), item in points:
+        row = math.floor(lat / cell_lat)
+        col = math.floor(lon / cell_lon)
+        duplicate = False
+        for r in (row - 1, row, row + 1):
+            for c in (col - 1, col, col + 1):
+                for k_lat, k_lon in grid.get((r, c), ()):
+                    if haversine_km(lat, lon, k_lat, k_lon) < threshold_km:
+                        duplicate = True
+                        break
+                if duplicate:
+                    break
+            if duplicate:
+                break
+        if not duplicate:
+            grid.setdefault((row, col), []).append((lat, lon))
+            kept.append(item)
+    return kept
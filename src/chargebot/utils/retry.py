@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retries with "full jitter" exponential backoff: attempt n waits uniform(0, min(max, base * 2**n))."""
+
+    retries: int = 2
+    base_delay_s: float = 0.2
+    max_delay_s: float = 2.0
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0.0, min(self.max_delay_s, self.base_delay_s * 2 ** attempt))
+
+
+async def retry(
+    fn: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    *,
+    should_retry: Callable[[BaseException], bool],
+    on_retry: Optional[Callable[[int, BaseException], None]] = None,
+) -> T:
+    """
+    Call fn until it succeeds, it raises something should_retry rejects, or
+    policy.retries extra attempts are used up; the last error is re-raised.
+    Only for idempotent calls.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt >= policy.retries or not should_retry(e):
+                raise
+            if on_retry is not None:
+                on_retry(attempt + 1, e)
+            await asyncio.sleep(policy.delay(attempt))
+            attempt += 1
+
+
+class LatencyTracker:
+    """Latencies of the last `window` successful calls, for picking a hedging delay."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Nearest-rank quantile, or None until min_samples calls were seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+async def hedged(
+    fn: Callable[[], Awaitable[T]],
+    delay_s: float,
+    *,
+    on_hedge: Optional[Callable[[], None]] = None,
+) -> T:
+    """
+    Start fn; if it hasn't finished after delay_s, start a second copy and
+    return whichever succeeds first, cancelling the other. If both fail, the
+    first error is raised. At most one extra call is made, so hedging at a
+    high latency quantile adds only a few percent of load.
+    """
+    tasks = [asyncio.ensure_future(fn())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay_s)
+        if done:
+            return tasks[0].result()
+        if on_hedge is not None:
+            on_hedge()
+        tasks.append(asyncio.ensure_future(fn()))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        assert error is not None
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Mark a loser's error as retrieved
+                task.exception()
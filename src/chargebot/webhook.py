@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import hmac
+import json
+import logging
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from .config import Settings
+
+
+logger = logging.getLogger(__name__)
+
+# Header Telegram sends with the secret_token given to setWebhook
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def webhook_handler(application: Application, secret: str):
+    """aiohttp handler that validates a webhook POST and queues the update for the application."""
+    expected = secret.encode()
+
+    async def handle(request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), expected):
+            logger.warning("Webhook request with a wrong secret token from %s", request.remote)
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+            update = Update.de_json(data, application.bot)
+        except (json.JSONDecodeError, TypeError, KeyError, ValueError) as e:
+            logger.warning("Malformed webhook update: %s", e)
+            return web.Response(status=400)
+        if update is None:
+            return web.Response(status=400)
+        # Answer right away; handlers run concurrently from the update queue like with polling
+        await application.update_queue.put(update)
+        return web.Response()
+
+    return handle
+
+
+def add_webhook_route(web_app: web.Application, application: Application, settings: Settings) -> None:
+    """Route webhook POSTs on web_app to the application."""
+    web_app.router.add_post(settings.webhook_path, webhook_handler(application, settings.webhook_secret))
+
+
+async def register_webhook(application: Application, settings: Settings) -> None:
+    """
+    Point Telegram at the webhook route; the server must already be
+    listening. Pending updates are kept: with several replicas behind one
+    URL the others may still be delivering them.
+    """
+    await application.bot.set_webhook(
+        url=settings.webhook_url + settings.webhook_path,
+        secret_token=settings.webhook_secret,
+        max_connections=settings.webhook_max_connections,
+        allowed_updates=Update.ALL_TYPES,
+    )
+    logger.info("Webhook set to %s%s", settings.webhook_url, settings.webhook_path)